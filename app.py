@@ -1,11 +1,11 @@
 # app.py
-from flask import Flask, render_template_string, request, send_file, jsonify
-import os, csv, tempfile, shutil, threading, json
+from flask import Flask, render_template_string, request, send_file, jsonify, Response, stream_with_context
+import os, csv, io, tempfile, shutil, threading, json, uuid
 from datetime import datetime, timedelta
-from io import BytesIO
 
 # import the check_email module (make sure check_email.py is in same folder)
 import check_email
+from results import ResultStore, Status, plan_refresh, merge_refresh
 
 app = Flask(__name__)
 
@@ -15,13 +15,8 @@ HISTORY_FOLDER = os.path.join(os.getcwd(), "results_history")
 os.makedirs(WORK_FOLDER, exist_ok=True)
 os.makedirs(HISTORY_FOLDER, exist_ok=True)
 
-from globals import progress_status
-import threading
-
-from globals import progress_status
-progress_lock = threading.Lock()
-task_control = {}
-task_control_lock = threading.Lock()
+# progress + pause/resume/stop signals, visible to every gunicorn worker
+from globals import state
 
 # ---------------- HTML (upgraded UI with live progress card) ----------------
 page_html = """
@@ -89,6 +84,7 @@ page_html = """
           <div style="font-weight:800;">Drag & Drop or select file</div>
           <div class="small">(.csv / .txt / .xlsx) — Name,Email</div>
           <div style="margin-top:12px;"><input type="file" name="email_file" accept=".csv" required></div>
+          <div class="small" style="margin-top:8px;">Deadline (minutes, optional) <input type="number" name="deadline_minutes" min="1" step="1" style="width:80px;padding:4px;border-radius:6px;"></div>
           <div style="margin-top:12px;"><button class="btn" type="submit">Upload & Verify</button></div>
         </div>
       </form>
@@ -98,6 +94,7 @@ page_html = """
       <form id="form_paste" action="/paste" method="post" onsubmit="startJob(event)">
         <input type="hidden" name="progressID" id="progressID2">
         <textarea name="email_text" rows="6" style="width:100%;padding:10px;border-radius:8px;" placeholder="Name,Email one per line or email per line" required></textarea>
+        <div class="small" style="margin-top:8px;">Deadline (minutes, optional) <input type="number" name="deadline_minutes" min="1" step="1" style="width:80px;padding:4px;border-radius:6px;"></div>
         <div style="margin-top:10px;"><button class="btn" type="submit">Verify Pasted List</button></div>
       </form>
     </div>
@@ -130,13 +127,15 @@ page_html = """
       {% for e in history %}
         {% set total = e.total if e.total>0 else 1 %}
         {% set good_pct = (e.valid / total * 100) | round(0) %}
-        {% set risky_pct = (e.catchall / total * 100) | round(0) %}
-        {% set bad_pct = (e.invalid / total * 100) | round(0) %}
+        {% set risky = e.catchall + (e.role | default(0)) %}
+        {% set bad = e.invalid + (e.disposable | default(0)) %}
+        {% set risky_pct = (risky / total * 100) | round(0) %}
+        {% set bad_pct = (bad / total * 100) | round(0) %}
         <div class="result-card">
           <div style="display:flex;justify-content:space-between;align-items:center;">
             <div>
               <div style="font-weight:800;">{{ e.filename }}</div>
-              <div class="small">{{ e.completed }} • id: {{ e.id }}</div>
+              <div class="small">{{ e.completed }} • id: {{ e.id }}{% if e.unknown %} • {{ e.unknown }} unknown{% endif %}</div>
             </div>
             <div style="text-align:right;">
               <div class="small">Total</div><div style="font-weight:800">{{ e.total }}</div>
@@ -150,19 +149,23 @@ page_html = """
             </div>
             <div style="flex:1;padding:10px;border-radius:8px;border:1px solid #eef6f7;background:#fff;">
               <div class="small">Risky</div>
-              <div style="font-weight:800">{{ risky_pct }}% <span class="small">({{ e.catchall }})</span></div>
+              <div style="font-weight:800">{{ risky_pct }}% <span class="small">({{ risky }})</span></div>
             </div>
             <div style="flex:1;padding:10px;border-radius:8px;border:1px solid #eef6f7;background:#fff;">
               <div class="small">Bad</div>
-              <div style="font-weight:800">{{ bad_pct }}% <span class="small">({{ e.invalid }})</span></div>
+              <div style="font-weight:800">{{ bad_pct }}% <span class="small">({{ bad }})</span></div>
             </div>
           </div>
 
           <div style="display:flex;justify-content:space-between;align-items:center;margin-top:12px;">
             <div class="small">Google Hosted: <strong>{{ e.googlehosted }}</strong></div>
             <div style="display:flex;gap:8px;align-items:center;">
-              <a class="download" href="/download/{{ e.excel }}">Download</a>
-              <button onclick="deleteResult('{{ e.excel }}')" 
+              <a class="download" href="/download/{{ e.excel|urlencode }}">Download</a>
+              <button onclick='refreshJob({{ e.id }}, {{ e.filename|tojson }})' title="Re-verify stale addresses"
+                style="border:none;background:#e7f7f6;color:#00a99d;padding:6px 10px;border-radius:6px;cursor:pointer;">
+                ↻
+              </button>
+              <button onclick='deleteResult({{ e.excel|tojson }})' 
                 style="border:none;background:#ffeaea;color:#a60000;padding:6px 10px;border-radius:6px;cursor:pointer;">
                 🗑️
               </button>
@@ -249,6 +252,17 @@ function pauseJob(pid){ fetch('/control/'+pid+'/pause'); }
 function resumeJob(pid){ fetch('/control/'+pid+'/resume'); }
 function stopJob(pid){ if(confirm('Stop this verification?')) fetch('/control/'+pid+'/stop'); }
 
+function refreshJob(id, filename){
+  const pid = Math.random().toString(36).slice(2,10);
+  const data = new FormData();
+  data.append('progressID', pid);
+  fetch('/refresh/'+id, { method: 'POST', body: data }).then(r=>r.json()).then(res=>{
+    if(!res.ok){ alert('Refresh failed: '+(res.error||'')); return; }
+    showLiveCard(pid, filename+' (refresh: '+res.reverify+' to re-verify)');
+    pollProgress(pid);
+  }).catch(err=>{ alert('Refresh failed: '+err); });
+}
+
 function deleteResult(file){
   if(!confirm('Delete this result?')) return;
   fetch('/delete/'+file, {method:'DELETE'}).then(r=>r.json()).then(res=>{
@@ -301,6 +315,14 @@ def load_history(days=10):
 def home():
     return render_template_string(page_html, history=load_history(), now_year=datetime.now().year)
 
+def form_deadline():
+    """Optional per-job deadline from the upload/paste form, in seconds (None = settings default)."""
+    try:
+        minutes = float(request.form.get('deadline_minutes') or 0)
+    except ValueError:
+        return None
+    return minutes * 60 if minutes > 0 else None
+
 @app.route('/upload', methods=['POST'])
 def upload():
     f = request.files.get('email_file')
@@ -311,11 +333,9 @@ def upload():
         return render_template_string(page_html, history=load_history(), message="Please choose a file.", now_year=datetime.now().year)
     clean_tmp()
     path = os.path.join(WORK_FOLDER, f.filename); f.save(path)
-    with progress_lock:
-        progress_status[pid] = {"percent": 0, "verified": 0, "queue": 0, "start_time": datetime.now().isoformat(), "eta_seconds": None, "state": "running", "status_text": "Queued"}
-    with task_control_lock:
-        task_control[pid] = {"state": "running"}
-    threading.Thread(target=verify_task, args=(path, f.filename, pid), daemon=True).start()
+    state.set_progress(pid, {"percent": 0, "verified": 0, "queue": 0, "start_time": datetime.now().isoformat(), "eta_seconds": None, "state": "running", "status_text": "Queued"})
+    state.set_control(pid, "running")
+    threading.Thread(target=verify_task, args=(path, f.filename, pid, form_deadline()), daemon=True).start()
     return render_template_string(page_html, history=load_history(), message="Verification started...", now_year=datetime.now().year)
 
 @app.route('/paste', methods=['POST'])
@@ -343,11 +363,9 @@ def paste():
     except Exception as ex:
         return f"Failed to write pasted file: {ex}", 500
 
-    with progress_lock:
-        progress_status[pid] = {"percent": 0, "verified": 0, "queue": 0, "start_time": datetime.now().isoformat(), "eta_seconds": None, "state": "running", "status_text": "Queued"}
-    with task_control_lock:
-        task_control[pid] = {"state": "running"}
-    threading.Thread(target=verify_task, args=(path, "Pasted.csv", pid), daemon=True).start()
+    state.set_progress(pid, {"percent": 0, "verified": 0, "queue": 0, "start_time": datetime.now().isoformat(), "eta_seconds": None, "state": "running", "status_text": "Queued"})
+    state.set_control(pid, "running")
+    threading.Thread(target=verify_task, args=(path, "Pasted.csv", pid, form_deadline()), daemon=True).start()
     return render_template_string(page_html, history=load_history(), message="Verification started...", now_year=datetime.now().year)
 
 @app.route('/single', methods=['POST'])
@@ -358,49 +376,36 @@ def single():
         pid = threading.current_thread().name + "_" + datetime.now().strftime("%s")
     if not email:
         return render_template_string(page_html, history=load_history(), message="No email entered.", now_year=datetime.now().year)
-    clean_tmp()
-    path = os.path.join(WORK_FOLDER, "SingleEmail.csv")
-    try:
-        with open(path, 'w', newline='', encoding='utf-8') as f:
-            w = csv.DictWriter(f, fieldnames=['Name', 'Email'])
-            w.writeheader()
-            w.writerow({'Name': 'Single', 'Email': email})
-    except Exception as ex:
-        return f"Failed to write single file: {ex}", 500
-
-    with progress_lock:
-        progress_status[pid] = {"percent": 0, "verified": 0, "queue": 0, "start_time": datetime.now().isoformat(), "eta_seconds": None, "state": "running", "status_text": "Queued"}
-    with task_control_lock:
-        task_control[pid] = {"state": "running"}
-    threading.Thread(target=verify_task, args=(path, "SingleEmail.csv", pid), daemon=True).start()
-    return render_template_string(page_html, history=load_history(), message="Verification started...", now_year=datetime.now().year)
 
-def verify_task(csv_path, filename, pid):
+    # one address: verify in-process instead of going through a CSV + worker thread
+    res = check_email.verify_single(email, name="Single")
+    stats = check_email.empty_stats()
+    check_email.tally(stats, res)
+    stats["total"] = 1
+    store = ResultStore()
+    store.append(res)
+    entry = record_history("SingleEmail.csv", stats, store)
+    state.set_progress(pid, {"percent": 100, "verified": entry["valid"], "queue": 0, "state": "finished", "eta_seconds": 0, "status_text": "Completed"})
+    return render_template_string(page_html, history=load_history(), message=f"{email}: {res['Status']}", now_year=datetime.now().year)
+
+def record_history(filename, stats, store, **extra):
     """
-    Calls check_email.main(csv_path, progress_id=pid, orig_filename=filename).
-    Expected return: (stats_dict, excel_bytes_io)
-    check_email should update app.progress_status[pid] while running if desired.
+    Saves the job's columnar result file under HISTORY_FOLDER and appends its
+    ledger entry. "excel" is only the download name: the workbook is rendered
+    from the result file when it is requested.
     """
-    try:
-        stats, excel_data = check_email.main(csv_path, progress_id=pid, orig_filename=filename)
-    except Exception as ex:
-        stats = {"valid": 0, "invalid": 0, "catchall": 0, "googlehosted": 0, "total": 0}
-        excel_data = BytesIO()
-        with open(os.path.join(HISTORY_FOLDER, "error.log"), "a", encoding="utf-8") as ef:
-            ef.write(f"{datetime.now().isoformat()} - verify_task error for {filename}: {repr(ex)}\\n")
-
-    # Save output workbook
     timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
     safe_name = filename.replace('.csv','').replace(' ', '_')
-    file_out = f"{timestamp}_{safe_name}.xlsx"
+    # jobs with the same name can finish within the same second; never share files
+    stem = f"{timestamp}_{uuid.uuid4().hex[:8]}_{safe_name}"
+    file_out = f"{stem}.xlsx"
+    results_out = f"{stem}.results.json.gz"
     try:
-        with open(os.path.join(HISTORY_FOLDER, file_out), "wb") as f:
-            if hasattr(excel_data, "getbuffer"):
-                f.write(excel_data.getbuffer())
-            else:
-                f.write(excel_data.read())
-    except Exception:
-        pass
+        store.save(os.path.join(HISTORY_FOLDER, results_out))
+    except Exception as ex:
+        results_out = None
+        with open(os.path.join(HISTORY_FOLDER, "error.log"), "a", encoding="utf-8") as ef:
+            ef.write(f"{datetime.now().isoformat()} - could not save results of {filename}: {repr(ex)}\n")
 
     # Update ledger
     history = read_history()
@@ -411,58 +416,311 @@ def verify_task(csv_path, filename, pid):
         "valid": int(stats.get("valid", 0)),
         "invalid": int(stats.get("invalid", 0)),
         "catchall": int(stats.get("catchall", 0)),
+        "disposable": int(stats.get("disposable", 0)),
+        "role": int(stats.get("role", 0)),
+        "unknown": int(stats.get("unknown", 0)),
         "googlehosted": int(stats.get("googlehosted", 0)),
         "total": int(stats.get("total", (stats.get('valid', 0) + stats.get('invalid', 0) + stats.get('catchall', 0)))),
-        "excel": file_out
+        "excel": file_out,
+        "results": results_out
     }
+    entry.update(extra)
     history.append(entry)
     write_history(history)
+    return entry
+
+def verify_task(csv_path, filename, pid, deadline=None):
+    """
+    Calls check_email.main(csv_path, progress_id=pid, orig_filename=filename, deadline=deadline).
+    Expected return: (stats_dict, ResultStore)
+    check_email publishes progress for pid through the shared state backend.
+    """
+    try:
+        stats, store = check_email.main(csv_path, progress_id=pid, orig_filename=filename, deadline=deadline)
+    except Exception as ex:
+        stats = {"valid": 0, "invalid": 0, "catchall": 0, "googlehosted": 0, "total": 0}
+        store = ResultStore()
+        with open(os.path.join(HISTORY_FOLDER, "error.log"), "a", encoding="utf-8") as ef:
+            ef.write(f"{datetime.now().isoformat()} - verify_task error for {filename}: {repr(ex)}\\n")
+
+    entry = record_history(filename, stats, store)
 
     # finalize progress
-    with progress_lock:
-        if pid in progress_status:
-            progress_status[pid].update({"percent": 100, "verified": entry["valid"], "queue": 0, "state": "finished", "eta_seconds": 0, "status_text": "Completed"})
-        else:
-            progress_status[pid] = {"percent": 100, "verified": entry["valid"], "queue": 0, "state": "finished", "eta_seconds": 0, "status_text": "Completed"}
+    state.update_progress(pid, percent=100, verified=entry["valid"], queue=0, state="finished", eta_seconds=0, status_text="Completed")
+
+@app.route('/refresh/<int:job_id>', methods=['POST'])
+def refresh(job_id):
+    """
+    Re-verifies only the stale part of a previous job: addresses older than
+    ttl_days (default refresh_ttl_days), catch-all/unknown and temp-failed
+    ones, plus addresses in an optional new "email_file" upload that the job
+    never saw. Everything else is carried over into the merged report.
+    """
+    entry = next((h for h in read_history() if h.get("id") == job_id), None)
+    if not entry:
+        return jsonify({"error": "job not found"}), 404
+    previous = load_results(entry, allow_xlsx=True)
+    if previous is None:
+        return jsonify({"error": "job has no stored results"}), 404
+
+    new_rows = []
+    f = request.files.get('email_file')
+    if f and f.filename:
+        path = os.path.join(WORK_FOLDER, f"refresh_{job_id}_{f.filename}")
+        f.save(path)
+        new_rows = check_email.read_rows(path)
+
+    cfg = check_email.load_settings()
+    try:
+        ttl_days = float(request.values.get('ttl_days', cfg.get("refresh_ttl_days", 30)))
+    except ValueError:
+        return jsonify({"error": "ttl_days must be a number"}), 400
+    todo = plan_refresh(previous, new_rows, ttl_seconds=ttl_days * 86400)
+
+    pid = request.values.get('progressID') or f"refresh_{job_id}_" + datetime.now().strftime("%s")
+    state.set_progress(pid, {"percent": 0, "verified": 0, "queue": len(todo), "start_time": datetime.now().isoformat(), "eta_seconds": None, "state": "running", "status_text": "Queued"})
+    state.set_control(pid, "running")
+    threading.Thread(target=refresh_task, args=(entry, previous, new_rows, todo, pid, cfg), daemon=True).start()
+    return jsonify({"ok": True, "progressID": pid, "reverify": len(todo), "previous_total": len(previous)})
+
+def refresh_task(entry, previous, new_rows, todo, pid, cfg):
+    try:
+        _, fresh = check_email.verify_rows(todo, progress_id=pid, cfg=cfg)
+    except Exception as ex:
+        fresh = ResultStore()
+        with open(os.path.join(HISTORY_FOLDER, "error.log"), "a", encoding="utf-8") as ef:
+            ef.write(f"{datetime.now().isoformat()} - refresh_task error for job {entry.get('id')}: {repr(ex)}\n")
+    merged = merge_refresh(previous, fresh, new_rows)
+    name = entry.get("filename", "job")
+    new_entry = record_history(name, merged.stats(), merged, refreshed_from=entry.get("id"), reverified=len(fresh))
+    state.update_progress(pid, percent=100, verified=new_entry["valid"], queue=0, state="finished", eta_seconds=0, status_text="Completed")
+
+# -------- JSON API --------
+def _parse_line(line, i):
+    """One NDJSON object/string or one pasted "name,email" line -> row dict (or None)."""
+    line = line.strip()
+    if not line:
+        return None
+    if line[0] in '{"':
+        item = json.loads(line)
+        if isinstance(item, str):
+            return check_email.normalize_row({"Email": item})
+        return check_email.normalize_row(item)
+    p = [x.strip() for x in line.split(',') if x.strip()]
+    name = p[0] if len(p) > 1 and '@' not in p[0] else f"User{i+1}"
+    return check_email.normalize_row({'Name': name, 'Email': p[-1]})
+
+def json_rows(body):
+    """
+    Rows of an application/json body: {"emails": [...]} or a bare list of
+    address strings / {"Name","Email"} objects. ValueError for anything else.
+    """
+    items = body.get('emails') if isinstance(body, dict) else body
+    if not isinstance(items, list):
+        raise ValueError('expected {"emails": [...]} or a JSON list')
+    rows = []
+    for n, item in enumerate(items):
+        if isinstance(item, str):
+            item = {"Email": item}
+        elif not isinstance(item, dict):
+            raise ValueError(f"item {n}: expected an address or an object with an Email field")
+        row = check_email.normalize_row(item)
+        if row:
+            rows.append(row)
+    return rows
+
+def api_rows():
+    """
+    Rows from a non-JSON request, read without buffering it:
+      - text/csv          a CSV with a header row, read as it streams in
+      - anything else     NDJSON or one "name,email" per line, read as it streams in
+      - multipart         the same formats in an "email_file" upload
+    A line that cannot be parsed yields {"error": ..., "line": n} instead of a row.
+    The request is looked at here, so the returned generator can be read from
+    another thread.
+    """
+
+    upload = request.files.get('email_file') if request.mimetype == 'multipart/form-data' else None
+    if upload is not None:
+        stream = io.TextIOWrapper(upload.stream, encoding='utf-8', newline='')
+        is_csv = upload.filename.lower().endswith('.csv')
+    else:
+        stream = io.TextIOWrapper(request.stream, encoding='utf-8', newline='')
+        is_csv = request.mimetype == 'text/csv'
+    return _csv_rows(stream) if is_csv else _line_rows(stream)
+
+def _csv_rows(stream):
+    for row in csv.DictReader(stream):
+        row = check_email.normalize_row(row)
+        if row:
+            yield row
+
+def _line_rows(stream):
+    for i, line in enumerate(stream):
+        try:
+            row = _parse_line(line, i)
+        except ValueError as ex:
+            # one bad line must not end the stream: report it and carry on
+            yield {"error": f"bad input: {ex}", "line": i + 1}
+            continue
+        if row:
+            yield row
+
+@app.route('/api/verify', methods=['POST'])
+def api_verify():
+    """
+    Streams one JSON result per line (application/x-ndjson) as each address
+    finishes, followed by a final {"summary": {...}} line with the totals.
+    A JSON body is read and checked up front (400 if malformed); in streamed
+    bodies each unparseable line is reported as {"error": ..., "line": n}
+    and the rest of the input is still verified.
+    """
+    if request.mimetype == 'application/json':
+        try:
+            rows = json_rows(request.get_json(force=True, silent=True))
+        except ValueError as ex:
+            return jsonify({"error": f"bad input: {ex}"}), 400
+    else:
+        rows = api_rows()
+
+    bad_lines = []
+
+    def checked(rows):
+        for row in rows:
+            if "error" in row:
+                bad_lines.append(row)
+            else:
+                yield row
+
+    def generate():
+        stats = check_email.empty_stats()
+        total = 0
+        errors = 0
+        try:
+            for res in check_email.iter_verify(checked(rows)):
+                while bad_lines:
+                    errors += 1
+                    yield json.dumps(bad_lines.pop(0)) + "\n"
+                total += 1
+                check_email.tally(stats, res)
+                yield json.dumps(res.to_dict(), ensure_ascii=False) + "\n"
+        except ValueError as ex:
+            yield json.dumps({"error": f"bad input: {ex}"}) + "\n"
+        except Exception as ex:
+            app.logger.exception("api_verify failed")
+            yield json.dumps({"error": f"failed: {ex!r}"}) + "\n"
+        while bad_lines:
+            errors += 1
+            yield json.dumps(bad_lines.pop(0)) + "\n"
+        stats["total"] = total
+        stats["errors"] = errors
+        yield json.dumps({"summary": stats}) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson',
+                    headers={"X-Accel-Buffering": "no", "Cache-Control": "no-cache"})
+
+@app.route('/api/single', methods=['GET', 'POST'])
+def api_single():
+    """
+    Synchronous one-address check: {"email": ..., "name": ..., "history": false}
+    as JSON, form fields or query args. Nothing is written to disk unless
+    history is requested.
+    """
+    params = request.get_json(silent=True) if request.is_json else None
+    params = params if isinstance(params, dict) else request.values
+    email = (params.get('email') or '').strip()
+    if not email:
+        return jsonify({"error": "email is required"}), 400
+    name = params.get('name') or ''
+    keep = params.get('history', False)
+    keep = keep if isinstance(keep, bool) else str(keep).lower() in ('1', 'true', 'yes')
+    use_cache = str(params.get('cache', True)).lower() not in ('0', 'false', 'no')
+
+    started = datetime.now()
+    res = check_email.verify_single(email, name=name, use_cache=use_cache)
+    if keep:
+        stats = check_email.empty_stats()
+        check_email.tally(stats, res)
+        stats["total"] = 1
+        store = ResultStore()
+        store.append(res)
+        record_history("SingleEmail.csv", stats, store)
+    return jsonify(dict(res.to_dict(), elapsed_ms=int((datetime.now() - started).total_seconds() * 1000)))
 
 @app.route('/progress/<pid>')
 def progress(pid):
-    with progress_lock:
-        data = progress_status.get(pid, {})
-    return jsonify(data or {})
+    return jsonify(state.get_progress(pid) or {})
 
 @app.route('/control/<pid>/pause')
 def control_pause(pid):
-    with task_control_lock:
-        task_control[pid] = {"state": "paused"}
-    with progress_lock:
-        if pid in progress_status:
-            progress_status[pid]["state"] = "paused"
+    state.set_control(pid, "paused")
+    if state.get_progress(pid):
+        state.update_progress(pid, state="paused")
     return jsonify({"ok": True})
 
 @app.route('/control/<pid>/resume')
 def control_resume(pid):
-    with task_control_lock:
-        task_control[pid] = {"state": "running"}
-    with progress_lock:
-        if pid in progress_status:
-            progress_status[pid]["state"] = "running"
+    state.set_control(pid, "running")
+    if state.get_progress(pid):
+        state.update_progress(pid, state="running")
     return jsonify({"ok": True})
 
 @app.route('/control/<pid>/stop')
 def control_stop(pid):
-    with task_control_lock:
-        task_control[pid] = {"state": "stopped"}
-    with progress_lock:
-        if pid in progress_status:
-            progress_status[pid]["state"] = "stopped"
+    state.set_control(pid, "stopped")
+    if state.get_progress(pid):
+        state.update_progress(pid, state="stopped")
     return jsonify({"ok": True})
 
+XLSX_MIME = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+def load_results(entry, allow_xlsx=False):
+    """
+    ResultStore for a history entry. Jobs recorded before result files existed
+    only have their workbook; it is parsed when ``allow_xlsx`` is set, else None.
+    """
+    name = entry.get("results")
+    path = os.path.join(HISTORY_FOLDER, name) if name else None
+    if path and os.path.exists(path):
+        return ResultStore.load(path)
+    legacy = os.path.join(HISTORY_FOLDER, entry.get("excel", ""))
+    if allow_xlsx and entry.get("excel") and os.path.exists(legacy):
+        return ResultStore.from_xlsx(legacy)
+    return None
+
+def send_export(entry, fmt='xlsx', statuses=None):
+    store = load_results(entry)
+    if store is None:
+        return "Not found", 404
+    base = entry["excel"].rsplit('.', 1)[0]
+    suffix = ("_" + "-".join(statuses)) if statuses else ""
+    if fmt == 'csv':
+        return send_file(store.to_csv(statuses), as_attachment=True, download_name=f"{base}{suffix}.csv", mimetype='text/csv')
+    return send_file(store.to_xlsx(statuses), as_attachment=True, download_name=f"{base}{suffix}.xlsx", mimetype=XLSX_MIME)
+
 @app.route('/download/<excel>')
 def download(excel):
     path = os.path.join(HISTORY_FOLDER, excel)
-    if not os.path.exists(path): return "Not found", 404
-    return send_file(path, as_attachment=True, download_name=excel, mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+    if os.path.exists(path):
+        # workbooks pre-built by older versions
+        return send_file(path, as_attachment=True, download_name=excel, mimetype=XLSX_MIME)
+    entry = next((h for h in read_history() if h.get("excel") == excel), None)
+    if not entry: return "Not found", 404
+    return send_export(entry)
+
+@app.route('/export/<int:job_id>')
+def export(job_id):
+    """Renders a stored job as ?format=xlsx|csv, optionally only ?status=valid,catchall,..."""
+    entry = next((h for h in read_history() if h.get("id") == job_id), None)
+    if not entry: return "Not found", 404
+    fmt = request.args.get('format', 'xlsx').lower()
+    if fmt not in ('xlsx', 'csv'):
+        return "Unsupported format", 400
+    statuses = [s.strip().lower() for s in request.args.get('status', '').split(',') if s.strip()] or None
+    unknown = [s for s in statuses or () if s.upper() not in Status.__members__]
+    if unknown:
+        return f"Unknown status: {', '.join(unknown)}", 400
+    return send_export(entry, fmt, statuses)
 
 @app.route('/delete/<excel>', methods=['DELETE'])
 def delete_result(excel):
@@ -470,13 +728,15 @@ def delete_result(excel):
     history = read_history()
     new_history = [h for h in history if h.get("excel") != excel]
     write_history(new_history)
-    # remove file
-    fpath = os.path.join(HISTORY_FOLDER, excel)
-    if os.path.exists(fpath):
-        try:
-            os.remove(fpath)
-        except Exception:
-            pass
+    # remove files
+    stored = [h.get("results") for h in history if h.get("excel") == excel and h.get("results")]
+    for name in [excel] + stored:
+        fpath = os.path.join(HISTORY_FOLDER, name)
+        if os.path.exists(fpath):
+            try:
+                os.remove(fpath)
+            except Exception:
+                pass
     return jsonify({"ok": True})
 
 if __name__ == "__main__":
@@ -5,8 +5,8 @@ a = Analysis(
     ['app.py'],
     pathex=[],
     binaries=[],
-    datas=[('templates', 'templates'), ('static', 'static')],
-    hiddenimports=[],
+    datas=[('templates', 'templates'), ('static', 'static'), ('data', 'data')],
+    hiddenimports=['dns.resolver', 'openpyxl'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
@@ -1,7 +1,10 @@
 import os
 import time
 import csv
-import tldextract
+import json
+from collections import deque
+from functools import lru_cache
+import public_suffix
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 from datetime import datetime
@@ -44,6 +47,80 @@ INDUSTRY_KEYWORDS = {
     "hotel": "Hospitality"
 }
 
+ENRICHMENT_DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "enrichment.json")
+DOMAIN_CACHE_SIZE = 65536
+
+
+def load_enrichment_data(path=ENRICHMENT_DATA):
+    """Merges extra TLD/keyword mappings from the data file over the built-in maps."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return
+    except Exception as ex:
+        print(f"⚠️  Could not load {path}: {ex}")
+        return
+    TLD_COUNTRY.update({k.lower(): v for k, v in data.get("tld_country", {}).items()})
+    INDUSTRY_KEYWORDS.update({k.lower(): v for k, v in data.get("industry_keywords", {}).items()})
+
+
+class KeywordMatcher:
+    """Aho-Corasick automaton over INDUSTRY_KEYWORDS.
+
+    Returns the value of the earliest-listed keyword found anywhere in the
+    text, i.e. the same answer as the old linear ``for key in ...: if key in``
+    scan, but in one pass over the text regardless of how many keywords exist.
+    """
+
+    def __init__(self, keywords):
+        self.values = list(keywords.values())
+        self.goto = [{}]
+        self.fail = [0]
+        self.best = [len(self.values)]
+        for rank, key in enumerate(keywords):
+            node = 0
+            for ch in key:
+                nxt = self.goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[node][ch] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.best.append(len(self.values))
+                node = nxt
+            self.best[node] = min(self.best[node], rank)
+
+        # BFS to wire failure links; each node inherits the best rank of its suffixes
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self.goto[node].items():
+                f = self.fail[node]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                self.best[nxt] = min(self.best[nxt], self.best[self.fail[nxt]])
+                queue.append(nxt)
+
+    def match(self, text, default=None):
+        goto, fail, best = self.goto, self.fail, self.best
+        node = 0
+        found = len(self.values)
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if best[node] < found:
+                found = best[node]
+                if found == 0:
+                    break
+        return self.values[found] if found < len(self.values) else default
+
+
+load_enrichment_data()
+INDUSTRY_MATCHER = KeywordMatcher(INDUSTRY_KEYWORDS)
+
 PENDING_DIR = "pending"
 RESULTS_DIR = "results"
 
@@ -56,7 +133,13 @@ if not os.path.exists(RESULTS_DIR):
 def guess_company_info(email):
     """Extracts company name, website, country, and industry from email domain."""
     domain = email.split("@")[-1].lower().strip()
-    ext = tldextract.extract(domain)
+    return _domain_info(domain)
+
+
+@lru_cache(maxsize=DOMAIN_CACHE_SIZE)
+def _domain_info(domain):
+    """Per-domain enrichment; memoized since large lists repeat a few domains."""
+    ext = public_suffix.extract(domain)
     base_domain = f"{ext.domain}.{ext.suffix}" if ext.suffix else ext.domain
 
     # Company Name
@@ -69,11 +152,7 @@ def guess_company_info(email):
     country = TLD_COUNTRY.get(ext.suffix, "Unknown")
 
     # Industry
-    industry = "Other"
-    for key, value in INDUSTRY_KEYWORDS.items():
-        if key in ext.domain:
-            industry = value
-            break
+    industry = INDUSTRY_MATCHER.match(ext.domain, "Other")
 
     return company_name, website, country, industry
 
@@ -126,8 +205,8 @@ class PendingHandler(FileSystemEventHandler):
             print(f"🚀 Starting verification for {base_name} ...")
             stats, _ = verify_main(enriched_path, progress_id=None, orig_filename=base_name)
             print(f"✅ Done: {base_name}")
-            print(f"📊 Results → Valid: {stats.get('valid',0)} | Risky: {stats.get('catchall',0)} | "
-                  f"Bad: {stats.get('invalid',0)} | Unknown: {stats.get('unknown',0)}")
+            print(f"📊 Results → Valid: {stats.get('valid',0)} | Risky: {stats.get('catchall',0) + stats.get('role',0)} | "
+                  f"Bad: {stats.get('invalid',0) + stats.get('disposable',0)} | Unknown: {stats.get('unknown',0)}")
 
             os.replace(file_path, os.path.join(RESULTS_DIR, base_name))
             print(f"📦 Moved original file to /results\n")
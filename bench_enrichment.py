@@ -0,0 +1,88 @@
+# bench_enrichment.py
+"""
+Enrichment throughput benchmark: rows/sec of guess_company_info() (and,
+with --csv, of enrich_csv() end to end) on a generated list.
+
+    python bench_enrichment.py                       # 1M rows over 5k domains
+    python bench_enrichment.py --rows 200000 --domains 50000 --csv
+
+To compare two versions, run it against another checkout with --src:
+
+    git worktree add /tmp/before <rev>
+    python bench_enrichment.py --src /tmp/before
+    python bench_enrichment.py
+
+(trees before the offline suffix list need tldextract installed.)
+"""
+import argparse
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+WORDS = ["acme", "global", "tech", "soft", "bank", "health", "edu", "media", "logistics", "green",
+         "cloud", "retail", "motors", "foods", "energy", "travel", "legal", "data", "labs", "studio"]
+SUFFIXES = ["com", "com", "com", "net", "org", "io", "in", "co.uk", "de", "fr", "com.au", "ca", "co.in"]
+
+
+def make_domains(count, seed=7):
+    rnd = random.Random(seed)
+    domains = set()
+    while len(domains) < count:
+        name = "-".join(rnd.sample(WORDS, rnd.randint(1, 2))) + str(rnd.randint(0, 9999))
+        domains.add(f"{name}.{rnd.choice(SUFFIXES)}")
+    return sorted(domains)
+
+
+def make_emails(rows, domains, seed=7):
+    rnd = random.Random(seed)
+    # a few big domains and a long tail, like real lists
+    weights = [1.0 / (i + 1) for i in range(len(domains))]
+    picked = rnd.choices(domains, weights=weights, k=rows)
+    return [f"user{i}@{d}" for i, d in enumerate(picked)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--domains", type=int, default=5000)
+    parser.add_argument("--csv", action="store_true", help="also time enrich_csv() on a generated file")
+    parser.add_argument("--src", default=HERE, help="checkout to import auto_enrich_scheduler from")
+    args = parser.parse_args()
+
+    src = os.path.abspath(args.src)
+    work = tempfile.mkdtemp(prefix="bench_enrich_")
+    # the scheduler creates pending/ and results/ in the working directory on import
+    os.chdir(work)
+    sys.path.insert(0, src)
+    import auto_enrich_scheduler as sched
+
+    emails = make_emails(args.rows, make_domains(args.domains))
+    print(f"source: {src}")
+    print(f"rows: {len(emails):,}  domains: {args.domains:,}")
+
+    started = time.perf_counter()
+    for email in emails:
+        sched.guess_company_info(email)
+    elapsed = time.perf_counter() - started
+    print(f"guess_company_info: {elapsed:.2f}s  {len(emails) / elapsed:,.0f} rows/sec")
+
+    if args.csv:
+        in_path = os.path.join(work, "list.csv")
+        out_path = os.path.join(work, "list_enriched.csv")
+        with open(in_path, "w", newline="", encoding="utf-8") as f:
+            w = csv.writer(f)
+            w.writerow(["Name", "Email"])
+            w.writerows([f"User{i}", e] for i, e in enumerate(emails))
+        started = time.perf_counter()
+        sched.enrich_csv(in_path, out_path)
+        elapsed = time.perf_counter() - started
+        print(f"enrich_csv: {elapsed:.2f}s  {len(emails) / elapsed:,.0f} rows/sec")
+
+
+if __name__ == "__main__":
+    main()
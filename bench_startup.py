@@ -0,0 +1,65 @@
+# bench_startup.py
+"""
+Cold-start benchmark: median wall time of importing app, check_email and
+auto_enrich_scheduler (plus the scheduler's first enrichment, which loads the
+suffix list) in fresh interpreters.
+
+    python bench_startup.py                # 7 runs each
+    python bench_startup.py --runs 15
+
+To compare two versions, run it against another checkout with --src:
+
+    git worktree add /tmp/before <rev>
+    python bench_startup.py --src /tmp/before
+    python bench_startup.py
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+CASES = [
+    ("import app", "import app"),
+    ("import check_email", "import check_email"),
+    ("import auto_enrich_scheduler", "import auto_enrich_scheduler"),
+    ("scheduler + first enrich", "import auto_enrich_scheduler as s; s.guess_company_info('a@example.co.uk')"),
+]
+
+TIMER = """
+import sys, time
+sys.path.insert(0, {src!r})
+t = time.perf_counter()
+{code}
+print((time.perf_counter() - t) * 1000)
+"""
+
+
+def measure(src, code, runs, cwd):
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", TIMER.format(src=src, code=code)],
+                             cwd=cwd, capture_output=True, text=True, check=True)
+        samples.append(float(out.stdout.strip().splitlines()[-1]))
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--src", default=HERE, help="checkout to import from")
+    args = parser.parse_args()
+
+    src = os.path.abspath(args.src)
+    # the scheduler creates pending/ and results/ in the working directory on import
+    work = tempfile.mkdtemp(prefix="bench_startup_")
+    print(f"source: {src}  (median of {args.runs} runs)")
+    for label, code in CASES:
+        print(f"  {label:<30} {measure(src, code, args.runs, work):7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,23 @@
 # check_email.py
 import csv
-import io
 import json
 import socket
 import smtplib
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from datetime import datetime
-from openpyxl import Workbook
-import dns.resolver
-import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
 import re
 import threading
 import os
 import logging
-from globals import progress_status
-
-progress_lock = threading.Lock()
+import queue
+from collections import OrderedDict
+from globals import state
+import domain_state
+import local_checks
+import smtp_identities
+import transcript
+from results import Result, ResultStore
+from shard_queue import ShardQueue, DEFAULT_LEASE, DEFAULT_SHARD_SIZE, worker_name
 
 log = logging.getLogger(__name__)
 if not log.handlers:
@@ -27,8 +28,99 @@ log.setLevel(logging.DEBUG)
 
 EMAIL_RE = re.compile(r"[^@]+@[^@]+\.[^@]+")
 
+KNOWN_DELIVERABLES = frozenset({
+    "gmail.com", "googlemail.com", "yahoo.com", "yahoo.co.in",
+    "outlook.com", "hotmail.com", "live.com", "aol.com", "icloud.com",
+    "msn.com", "protonmail.com", "me.com", "mac.com",
+    "zoho.com", "office365.com", "gmx.com", "mail.com", "yandex.com"
+})
+
+
+class TTLCache:
+    """
+    Small thread-safe LRU with per-entry expiry, shared by every job in the process.
+
+    With a ``namespace`` and a shared state backend it is also backed by that
+    backend, so an answer learned by one worker process is reused by the others.
+    """
+
+    def __init__(self, maxsize=10000, namespace=None, encode=None, decode=None):
+        self.maxsize = maxsize
+        self.namespace = namespace
+        self.encode = encode or (lambda v: v)
+        self.decode = decode or (lambda v: v)
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                expires, value = item
+                if expires >= time.time():
+                    self._data.move_to_end(key)
+                    return value
+                del self._data[key]
+        if self.namespace and state.shared:
+            try:
+                item = state.cache_get(self.namespace, key)
+            except Exception:
+                # locked / unreadable state file: a miss, never a verdict
+                log.debug("shared cache read failed for %s/%s", self.namespace, key, exc_info=True)
+                item = None
+            if item is not None:
+                expires, raw = item
+                value = self.decode(raw)
+                self._put(key, value, expires)
+                return value
+        return default
+
+    def set(self, key, value, ttl):
+        if ttl <= 0:
+            return
+        self._put(key, value, time.time() + ttl)
+        if self.namespace and state.shared:
+            try:
+                state.cache_set(self.namespace, key, self.encode(value), ttl)
+            except Exception:
+                log.debug("shared cache write failed for %s/%s", self.namespace, key, exc_info=True)
+
+    def _put(self, key, value, expires):
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+mx_cache = TTLCache(maxsize=20000, namespace="mx")
+catchall_cache = TTLCache(maxsize=20000, namespace="catchall")
+result_cache = TTLCache(maxsize=50000, namespace="result", encode=Result.to_dict, decode=Result.from_dict)
+# seconds the last SMTP round for a domain took; feeds cost_tier()
+latency_cache = TTLCache(maxsize=20000, namespace="latency")
+
+_settings_cache = {"mtime": None, "cfg": None}
+
 
 def load_settings():
+    """Reads settings.json, re-parsing it only when the file has changed."""
+    try:
+        mtime = os.path.getmtime("settings.json")
+    except OSError:
+        mtime = None
+    if mtime is not None and _settings_cache["mtime"] == mtime:
+        return dict(_settings_cache["cfg"])
+    cfg = _read_settings()
+    if mtime is not None:
+        _settings_cache.update(mtime=mtime, cfg=dict(cfg))
+    return cfg
+
+
+def _read_settings():
     defaults = {
         "threads": 20,
         "min_threads": 5,
@@ -36,7 +128,30 @@ def load_settings():
         "dns_timeout": 6,
         "smtp_timeout": 8,
         "from_address": "verify@yourdomain.com",
-        "assume_mx_valid": False
+        "helo_name": "yourdomain.com",
+        "smtp_port": 25,
+        "smtp_identities": [],
+        "identity_rate": 0,
+        "identity_block_after": 3,
+        "identity_retire_seconds": 900,
+        "assume_mx_valid": False,
+        "dns_cache_ttl": 3600,
+        "dns_negative_ttl": 300,
+        "catchall_cache_ttl": 86400,
+        "result_cache_ttl": 900,
+        "flag_disposable": True,
+        "flag_role_accounts": True,
+        "refresh_ttl_days": 30,
+        "transcript_record": "",
+        "transcript_replay": "",
+        "replay_speed": 1.0,
+        "job_deadline_seconds": 0,
+        "distributed_stall_seconds": 60,
+        "slow_mx_seconds": 5,
+        "infer_reject_after": 5,
+        "infer_timeout_after": 3,
+        "infer_catchall_after": 1,
+        "slow_mx_providers": ["mimecast.com", "pphosted.com", "ppe-hosted.com", "barracudanetworks.com", "messagelabs.com"]
     }
     try:
         with open("settings.json", "r", encoding="utf-8") as f:
@@ -53,6 +168,8 @@ def load_settings():
 
 
 def get_mx_hosts(domain, timeout=8):
+    # imported on first lookup so workers that never resolve don't pay for dnspython
+    import dns.resolver
     try:
         resolver = dns.resolver.Resolver()
         resolver.timeout = timeout
@@ -66,22 +183,67 @@ def get_mx_hosts(domain, timeout=8):
         return []
 
 
+def smtp_rcpt(host, email, cfg, avoid=()):
+    """
+    One HELO / MAIL FROM / RCPT TO dialogue; returns the RCPT (code, msg) or
+    raises. A refusal of the identity raises smtp_identities.Blocked carrying
+    the identity, so the caller can retry with ``avoid`` set to those tried.
+    """
+    replayer = transcript.replayer_for(cfg)
+    if replayer:
+        return replayer.smtp(host, email)
+    recorder = transcript.recorder_for(cfg)
+    pool = smtp_identities.pool_for(cfg)
+    identity = pool.acquire(avoid)
+    started = time.perf_counter()
+    try:
+        server = smtplib.SMTP(timeout=cfg.get("smtp_timeout", 8), local_hostname=identity.helo,
+                              source_address=identity.source_address)
+        greeting = server.connect(host, int(cfg.get("smtp_port", 25)))
+        if greeting[0] != 220:
+            # what smtplib.SMTP(host) does; a bare connect() would go on to HELO a closed socket
+            server.close()
+            if smtp_identities.is_block(*greeting):
+                raise smtp_identities.Blocked(*greeting)
+            raise smtplib.SMTPConnectError(*greeting)
+        server.helo(identity.helo)
+        sender_reply = server.mail(cfg.get("from_address", "verify@yourdomain.com"))
+        if sender_reply[0] >= 500 and not smtp_identities.is_block(*sender_reply):
+            # refused at MAIL FROM: the RCPT that follows would only get a 503
+            code, msg = sender_reply[0], b"MAIL FROM: " + (sender_reply[1] or b"")
+        else:
+            code, msg = server.rcpt(email)
+        try:
+            server.quit()
+        except Exception:
+            pass
+        # a refusal of our source address / HELO says nothing about the mailbox
+        if smtp_identities.is_block(*sender_reply):
+            raise smtp_identities.Blocked(*sender_reply)
+        if smtp_identities.is_client_block(code, msg):
+            raise smtp_identities.Blocked(code, msg)
+    except Exception as ex:
+        pool.report(identity, error=ex)
+        if isinstance(ex, smtp_identities.Blocked):
+            ex.identity = identity
+        if recorder:
+            recorder.smtp(host, email, (time.perf_counter() - started) * 1000, error=ex)
+        raise
+    pool.report(identity)
+    if recorder:
+        recorder.smtp(host, email, (time.perf_counter() - started) * 1000, code=code, msg=msg)
+    return code, msg
+
+
 def smtp_check_host(mx_host, email, cfg):
-    from_address = cfg.get("from_address", "verify@yourdomain.com")
-    timeout = cfg.get("smtp_timeout", 8)
     host = mx_host.rstrip(".")
-    last_err = None
-    for attempt in (1, 2):
+    retries = 1
+    # a blocked identity is retried on the others before giving up on this host
+    pool_size = len(smtp_identities.pool_for(cfg).identities)
+    blocked = []
+    while True:
         try:
-            server = smtplib.SMTP(timeout=timeout)
-            server.connect(host)
-            server.helo("yourdomain.com")
-            server.mail(from_address)
-            code, msg = server.rcpt(email)
-            try:
-                server.quit()
-            except Exception:
-                pass
+            code, msg = smtp_rcpt(host, email, cfg, avoid=blocked)
             log.debug("SMTP %s rcpt %s -> %s %s", host, email, code, msg)
             try:
                 code = int(code)
@@ -91,21 +253,73 @@ def smtp_check_host(mx_host, email, cfg):
             if code in (250, 251):
                 return True, f"Accepted ({code})"
             if code == 550:
-                return False, f"Rejected ({code})"
+                return False, f"Rejected ({code}) {reply_text(msg)}".rstrip()
             # 4xx = temporary / greylist -> risky hint
             if 400 <= code < 500:
                 return False, f"risky:temp_error({code})"
             return False, f"risky:unknown_response({code})"
+        except smtp_identities.Blocked as ex:
+            log.debug("SMTP %s blocked us for %s: %s %s", host, email, ex.smtp_code, ex.smtp_error)
+            blocked.append(getattr(ex, "identity", None))
+            if len(blocked) < pool_size:
+                continue
+            return False, f"blocked:{ex.smtp_code} {reply_text(ex.smtp_error)}".rstrip()
         except (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, socket.timeout, socket.error) as ex:
-            last_err = ex
-            if attempt == 1:
-                time.sleep(0.8)
+            if retries:
+                retries -= 1
+                pause(0.8, cfg)
                 continue
             return False, f"err:{repr(ex)}"
         except Exception as ex:
-            last_err = ex
             return False, f"err:{repr(ex)}"
-    return False, f"err:{repr(last_err)}"
+
+
+def reply_text(msg, limit=120):
+    """An SMTP reply message as one short line for result details."""
+    if isinstance(msg, bytes):
+        msg = msg.decode("utf-8", "replace")
+    return " ".join((msg or "").split())[:limit]
+
+
+def pause(seconds, cfg):
+    """time.sleep() that follows the replay speed when replaying a transcript."""
+    replayer = transcript.replayer_for(cfg)
+    if replayer:
+        replayer.wait(seconds)
+    else:
+        time.sleep(seconds)
+
+
+def lookup_mx(domain, cfg):
+    """get_mx_hosts() through the shared MX cache; empty answers expire sooner."""
+    replayer = transcript.replayer_for(cfg)
+    if replayer:
+        return replayer.mx(domain)
+    started = time.perf_counter()
+    hosts = mx_cache.get(domain)
+    if hosts is None:
+        hosts = get_mx_hosts(domain, timeout=cfg.get("dns_timeout", 6))
+        mx_cache.set(domain, hosts, cfg.get("dns_cache_ttl", 3600) if hosts else cfg.get("dns_negative_ttl", 300))
+    recorder = transcript.recorder_for(cfg)
+    if recorder:
+        recorder.mx(domain, hosts, (time.perf_counter() - started) * 1000)
+    return hosts
+
+
+def is_catch_all(mx_hosts, domain, cfg):
+    """check_catch_all() through the shared per-domain cache."""
+    replayer = transcript.replayer_for(cfg)
+    if replayer:
+        return replayer.catchall(domain)
+    started = time.perf_counter()
+    verdict = catchall_cache.get(domain)
+    if verdict is None:
+        verdict = check_catch_all(mx_hosts, domain, cfg)
+        catchall_cache.set(domain, verdict, cfg.get("catchall_cache_ttl", 86400))
+    recorder = transcript.recorder_for(cfg)
+    if recorder:
+        recorder.catchall(domain, verdict, (time.perf_counter() - started) * 1000)
+    return verdict
 
 
 def check_catch_all(mx_hosts, domain, cfg):
@@ -120,16 +334,15 @@ def check_catch_all(mx_hosts, domain, cfg):
     return False
 
 
-def verify_address(row, cfg):
+def verify_address(row, cfg, tracker=None):
+    """
+    Verifies one row and returns its Result. With a DomainTracker the outcome
+    is fed back per domain, and domains with an established domain-wide
+    verdict are answered without DNS or SMTP.
+    """
     email_raw = (row.get("Email") or "").strip()
     name = row.get("Name") or ""
-    result = {
-        "Name": name,
-        "Email": email_raw,
-        "Status": "unknown",
-        "Detail": "",
-        "CheckedAt": datetime.utcnow().isoformat()
-    }
+    result = Result(name, email_raw)
 
     if not email_raw:
         result["Status"] = "invalid"
@@ -142,34 +355,61 @@ def verify_address(row, cfg):
         result["Detail"] = "bad_format"
         return result
 
-    domain = email.split("@", 1)[1].lower()
+    # strict syntax, disposable-provider and role-account checks: no network needed
+    local = local_checks.classify(email, cfg)
+    if local:
+        result["Status"], result["Detail"] = local
+        return result
 
-    KNOWN_DELIVERABLES = {
-        "gmail.com", "googlemail.com", "yahoo.com", "yahoo.co.in",
-        "outlook.com", "hotmail.com", "live.com", "aol.com", "icloud.com",
-        "msn.com", "protonmail.com", "me.com", "mac.com",
-        "zoho.com", "office365.com", "gmx.com", "mail.com", "yandex.com"
-    }
+    domain = email.rsplit("@", 1)[1]
 
     if domain in KNOWN_DELIVERABLES:
         result["Status"] = "valid"
         result["Detail"] = "trusted_domain"
         return result
 
-    mx_hosts = get_mx_hosts(domain, timeout=cfg.get("dns_timeout", 6))
+    inferred = tracker.lookup(domain) if tracker else None
+    if inferred:
+        result["Status"], result["Detail"] = inferred
+        return result
+
+    mx_hosts = lookup_mx(domain, cfg)
     if not mx_hosts:
         result["Status"] = "invalid"
         result["Detail"] = "no_mx_records"
         return result
 
+    host_outcomes = []
+    result = smtp_verdict(result, email, domain, mx_hosts, cfg, host_outcomes)
+    if tracker and tracker.observe(domain, domain_outcome(result, host_outcomes), result.status):
+        tracker.confirm_reject(domain, result.status, rejects_postmaster(mx_hosts, domain, cfg))
+    return result
+
+
+def smtp_verdict(result, email, domain, mx_hosts, cfg, host_outcomes):
+    """RCPT-probes ``mx_hosts`` and fills in ``result``; each host's REJECT/TIMEOUT/None lands in ``host_outcomes``."""
     accepted_any = False
+    rejected_any = False
     last_detail = ""
+    blocked_detail = ""
     risky_hint_found = False
+    smtp_started = time.time()
 
     for host in mx_hosts:
         try:
             accepted, detail = smtp_check_host(host, email, cfg)
             last_detail = f"{host} - {detail}"
+            if detail.startswith("blocked:"):
+                # every identity was refused: no verdict from this host
+                blocked_detail = last_detail
+                host_outcomes.append(None)
+                continue
+            if detail.startswith("Rejected"):
+                rejected_any = True
+                # "user unknown" rejects this mailbox only; policy / MAIL FROM refusals may be domain-wide
+                host_outcomes.append(None if domain_state.is_mailbox_rejection(detail) else domain_state.REJECT)
+            else:
+                host_outcomes.append(domain_state.TIMEOUT if detail.startswith("err:") else None)
             if accepted:
                 accepted_any = True
                 break
@@ -180,11 +420,13 @@ def verify_address(row, cfg):
                 continue
         except Exception as ex:
             last_detail = f"{host} - err:{repr(ex)}"
+            host_outcomes.append(domain_state.TIMEOUT)
             continue
+    latency_cache.set(domain, time.time() - smtp_started, cfg.get("dns_cache_ttl", 3600))
 
     if accepted_any:
         try:
-            is_catch = check_catch_all(mx_hosts, domain, cfg)
+            is_catch = is_catch_all(mx_hosts, domain, cfg)
         except Exception:
             is_catch = False
         if is_catch:
@@ -195,6 +437,12 @@ def verify_address(row, cfg):
             result["Detail"] = "rcpt_ok"
         return result
 
+    if blocked_detail and not rejected_any:
+        # the MXs refused us, not the mailbox: leave it for a later retry
+        result["Status"] = "unknown"
+        result["Detail"] = blocked_detail
+        return result
+
     # If none accepted, decide invalid or catch-all
     # Prefer marking invalid for explicit rejections or clear "no such user" responses
     # Treat risky hints as invalid by default (more conservative)
@@ -226,102 +474,524 @@ def verify_address(row, cfg):
     return result
 
 
-def main(csv_path, progress_id=None, orig_filename=None):
-    cfg = load_settings()
+def rejects_postmaster(mx_hosts, domain, cfg):
+    """
+    Domain-level check before inferring "rejects everything": postmaster@ must
+    be deliverable on any working domain (RFC 5321), so only a plain rejection
+    of it from every MX confirms the streak.
+    """
+    for host in mx_hosts:
+        try:
+            accepted, detail = smtp_check_host(host, f"postmaster@{domain}", cfg)
+        except Exception:
+            return False
+        if accepted or not detail.startswith("Rejected"):
+            return False
+    return True
+
+
+def domain_outcome(result, host_outcomes):
+    """What one address says about its whole domain, for DomainTracker.observe()."""
+    if result.detail == "catch_all_detected":
+        return domain_state.CATCHALL
+    if result.detail == "rcpt_ok":
+        return domain_state.ACCEPT
+    if host_outcomes and all(o == domain_state.REJECT for o in host_outcomes):
+        return domain_state.REJECT
+    if host_outcomes and all(o == domain_state.TIMEOUT for o in host_outcomes):
+        return domain_state.TIMEOUT
+    return None
+
+
+def verify_single(email, name="", cfg=None, use_cache=True):
+    """
+    Verifies one address in-process and returns its Result.
+
+    No CSV, thread pool or workbook is involved, so an interactive check costs
+    the DNS/SMTP exchange and nothing else; repeated checks within
+    ``result_cache_ttl`` are answered from the result cache.
+    """
+    if cfg is None:
+        cfg = load_settings()
+    key = (email or "").strip().lower()
+    if use_cache and key:
+        cached = result_cache.get(key)
+        if cached is not None:
+            return cached.copy(Name=name, Email=email.strip())
+    result = verify_address({"Name": name, "Email": email}, cfg)
+    if key and result.get("Status") != "unknown":
+        result_cache.set(key, result.copy(), cfg.get("result_cache_ttl", 900))
+    return result
 
+
+def cost_tier(email, cfg, mx_seen=None):
+    """
+    Rough cost of verifying ``email`` with what is already known:
+    0 decided locally (syntax, disposable/role, trusted domain),
+    1 MX already cached and not known to be slow,
+    2 nothing known about the domain yet,
+    3 a known-slow provider (listed MX gateway or a slow last SMTP round).
+    """
+    email = (email or "").strip().lower()
+    if not EMAIL_RE.match(email) or local_checks.classify(email, cfg):
+        return 0
+    domain = email.rsplit("@", 1)[1]
+    if domain in KNOWN_DELIVERABLES:
+        return 0
+    if mx_seen is not None and domain in mx_seen:
+        return mx_seen[domain]
+    hosts = mx_cache.get(domain)
+    slow_providers = tuple(cfg.get("slow_mx_providers") or ())
+    latency = latency_cache.get(domain)
+    if hosts is not None and not hosts:
+        tier = 1
+    elif (latency is not None and latency >= cfg.get("slow_mx_seconds", 5)) or \
+            any(h.rstrip(".").lower().endswith(slow_providers) for h in hosts or ()):
+        tier = 3
+    else:
+        tier = 1 if hosts else 2
+    if mx_seen is not None:
+        mx_seen[domain] = tier
+    return tier
+
+
+def order_by_cost(rows, cfg):
+    """``rows`` sorted cheapest-first (stable, so a domain's addresses stay together in input order)."""
+    seen = {}
+    return sorted(rows, key=lambda row: cost_tier(row.get("Email"), cfg, seen))
+
+
+def resolve_threads(cfg):
     tcfg = str(cfg.get("threads", "20"))
     if tcfg.lower() == "auto":
-        cores = multiprocessing.cpu_count()
+        cores = os.cpu_count() or 1
         cfg["threads"] = max(cfg.get("min_threads", 5),
                              min(cfg.get("max_threads", 50), cores * 5))
+    return int(cfg.get("threads", 20))
+
+
+def normalize_row(row):
+    """Maps the accepted column spellings onto {"Name", "Email"}; None if there is no address."""
+    if not isinstance(row, dict):
+        return None
+    email = str(
+        row.get("Email") or row.get("email") or
+        row.get("Email Address") or row.get("email address") or ""
+    ).strip()
+    name = str(row.get("Name") or row.get("name") or "")
+    if not email:
+        return None
+    return {"Name": name, "Email": email}
+
+
+def empty_stats():
+    return {"valid": 0, "catchall": 0, "invalid": 0, "unknown": 0, "disposable": 0, "role": 0}
+
+
+def tally(stats, res):
+    st = res.get("Status", "invalid")
+    if st in stats:
+        stats[st] += 1
+    else:
+        stats["invalid"] += 1
+
+
+# end-of-input marker on iter_verify's result queue
+_FED = object()
+
+
+def iter_verify(rows, cfg=None, threads=None, with_rows=False, deadline=None, tracker=None):
+    """
+    Verifies rows concurrently and yields each Result as soon as it is done
+    (or (row, Result) pairs with ``with_rows``).
+
+    ``rows`` may be any iterable, including one that is still being read from
+    a socket: a reader thread feeds it to the workers, keeping at most a few
+    batches in flight, and each result is yielded as soon as it is done, even
+    while the reader is still waiting for input. With ``deadline`` (a
+    time.time() value) it stops at that moment and abandons what is in flight.
+    One DomainTracker (a fresh one unless ``tracker`` is given) is shared by
+    the whole call, so domain-wide verdicts carry across its rows.
+    """
+    if cfg is None:
+        cfg = load_settings()
+    if threads is None:
+        threads = resolve_threads(cfg)
+    if tracker is None:
+        tracker = domain_state.DomainTracker(cfg)
+    max_pending = threads * 4
+
+    executor = ThreadPoolExecutor(max_workers=threads)
+    finished = queue.Queue()
+    slots = threading.Semaphore(max_pending)
+    closed = threading.Event()
+
+    def feed():
+        submitted = 0
+        try:
+            for row in rows:
+                while not slots.acquire(timeout=0.2):
+                    if closed.is_set():
+                        return
+                if closed.is_set():
+                    return
+                future = executor.submit(verify_address, row, cfg, tracker)
+                future.add_done_callback(lambda f, row=row: finished.put((row, f)))
+                submitted += 1
+        except Exception as ex:
+            # surfaced in the consuming thread, after the results already in flight
+            finished.put((_FED, (submitted, ex)))
+            return
+        finished.put((_FED, (submitted, None)))
 
-    threads = int(cfg.get("threads", 20))
-    log.debug("Running with %s threads", threads)
-
+    reader = threading.Thread(target=feed, name="iter_verify-reader", daemon=True)
+    reader.start()
+    try:
+        done = 0
+        fed = None
+        while fed is None or done < fed[0]:
+            timeout = None if deadline is None else deadline - time.time()
+            if timeout is not None and timeout <= 0:
+                return
+            try:
+                row, future = finished.get(timeout=timeout)
+            except queue.Empty:
+                return
+            if row is _FED:
+                fed = future
+                continue
+            done += 1
+            slots.release()
+            try:
+                res = future.result()
+            except Exception as e:
+                log.exception("verify_address exception")
+                res = Result(row.get("Name", ""), row.get("Email", ""), "invalid", str(e))
+            yield (row, res) if with_rows else res
+        if fed[1] is not None:
+            raise fed[1]
+    finally:
+        # closed early (job stopped, API client went away): drop queued rows instead of draining them
+        closed.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+        if tracker.inferred:
+            log.debug("Answered %s rows from domain-wide verdicts", tracker.inferred)
+
+
+def read_rows(csv_path):
+    """Loads {"Name", "Email"} rows from an uploaded CSV; [] if it is unreadable or has no header."""
     try:
         with open(csv_path, newline="", encoding="utf-8") as f:
             reader = csv.DictReader(f)
             if not reader.fieldnames:
                 log.debug("DEBUG: No headers found in CSV at %s", csv_path)
-                return {"valid": 0, "invalid": 0, "catchall": 0, "unknown": 0, "total": 0}, io.BytesIO()
+                return []
             rows = []
             for row in reader:
-                email = (
-                    row.get("Email") or row.get("email") or
-                    row.get("Email Address") or row.get("email address") or ""
-                ).strip()
-                name = row.get("Name") or row.get("name") or ""
-                if email:
-                    rows.append({"Name": name, "Email": email})
+                row = normalize_row(row)
+                if row:
+                    rows.append(row)
     except Exception as ex:
         log.exception("Failed to open/read CSV %s", csv_path)
-        return {"valid": 0, "invalid": 0, "catchall": 0, "unknown": 0, "total": 0}, io.BytesIO()
+        return []
 
     log.debug("DEBUG loaded rows: %s", len(rows))
+    return rows
+
+
+def wait_if_paused(progress_id):
+    """Blocks while the job is paused; returns False once it has been stopped."""
+    while True:
+        control = state.get_control(progress_id)
+        if control == "stopped":
+            return False
+        if control != "paused":
+            return True
+        time.sleep(0.5)
+
+
+def job_deadline(cfg, deadline=None):
+    """Absolute end time for a job given ``deadline`` seconds (or "job_deadline_seconds"); None = no deadline."""
+    seconds = deadline if deadline is not None else cfg.get("job_deadline_seconds", 0)
+    try:
+        seconds = float(seconds or 0)
+    except (TypeError, ValueError):
+        return None
+    return time.time() + seconds if seconds > 0 else None
+
+
+def deadline_result(row):
+    return Result(row.get("Name", ""), row.get("Email", ""), "unknown", "deadline")
+
+
+def verify_rows(rows, progress_id=None, cfg=None, deadline=None):
+    """
+    Verifies already-loaded rows, publishing progress under ``progress_id``;
+    returns (stats, ResultStore) in input order. Pause/stop signals for
+    ``progress_id`` are honoured from whichever worker they were sent to.
+
+    With a deadline (``deadline`` seconds, or "job_deadline_seconds") rows are
+    worked cheapest-first (see cost_tier) and whatever is not done when time
+    runs out is reported as unknown / "deadline", so the report stays complete.
+    """
+    if cfg is None:
+        cfg = load_settings()
+    ends_at = job_deadline(cfg, deadline)
+    threads = resolve_threads(cfg)
+    log.debug("Running with %s threads", threads)
 
     total = len(rows)
     if total == 0:
         log.debug("DEBUG: No valid rows found in CSV.")
-        return {"valid": 0, "invalid": 0, "catchall": 0, "unknown": 0, "total": 0}, io.BytesIO()
+        return dict(empty_stats(), total=0), ResultStore()
 
-    results = []
-    stats = {"valid": 0, "catchall": 0, "invalid": 0, "unknown": 0}
+    stats = empty_stats()
     start_time = time.time()
 
-    with ThreadPoolExecutor(max_workers=threads) as executor:
-        futures = {executor.submit(verify_address, row, cfg): row for row in rows}
-        completed_count = 0
-        for future in as_completed(futures):
-            completed_count += 1
-            try:
-                res = future.result()
-            except Exception as e:
-                log.exception("verify_address exception")
-                res = {"Name": "", "Email": "", "Status": "invalid", "Detail": str(e), "CheckedAt": datetime.utcnow().isoformat()}
-            results.append(res)
-
-            st = res.get("Status", "invalid")
-            if st == "valid":
-                stats["valid"] += 1
-            elif st == "catchall":
-                stats["catchall"] += 1
-            elif st == "unknown":
-                stats["unknown"] += 1
-            else:
-                stats["invalid"] += 1
-
-            if progress_id and (completed_count % 5 == 0 or completed_count == total):
-                with progress_lock:
-                    progress_status[progress_id] = {
-                        "percent": int(completed_count / total * 100),
-                        "verified": completed_count,
-                        "queue": total - completed_count,
-                        "state": "running",
-                        "eta_seconds": max(1, int((time.time() - start_time) / max(1, completed_count) * (total - completed_count)))
-                    }
+    slots = [None] * total
+    work = [dict(row, _index=i) for i, row in enumerate(rows)]
+    if ends_at is not None:
+        work = order_by_cost(work, cfg)
+    stopped = False
+    completed_count = 0
+    last_control_check = 0.0
+    verifier = iter_verify(work, cfg, threads, with_rows=True, deadline=ends_at)
+    for row, res in verifier:
+        completed_count += 1
+        slots[row["_index"]] = res
+        tally(stats, res)
+
+        if progress_id and time.time() - last_control_check > 0.5:
+            last_control_check = time.time()
+            if not wait_if_paused(progress_id):
+                log.debug("Job %s stopped after %s/%s rows", progress_id, completed_count, total)
+                verifier.close()
+                stopped = True
+                break
+
+        if progress_id and (completed_count % 5 == 0 or completed_count == total):
+            eta = (time.time() - start_time) / max(1, completed_count) * (total - completed_count)
+            if ends_at is not None:
+                eta = min(eta, ends_at - time.time())
+            state.set_progress(progress_id, {
+                "percent": int(completed_count / total * 100),
+                "verified": completed_count,
+                "queue": total - completed_count,
+                "state": "running",
+                "eta_seconds": max(1, int(eta))
+            })
+
+    if not stopped and completed_count < total:
+        log.debug("Deadline reached after %s/%s rows", completed_count, total)
+        for i, row in enumerate(rows):
+            if slots[i] is None:
+                slots[i] = deadline_result(row)
+                tally(stats, slots[i])
+                completed_count += 1
 
     duration = round(time.time() - start_time, 2)
     log.debug("Processed %s emails in %ss", total, duration)
-
-    wb = Workbook()
-    categories = {
-        "Valid": [r for r in results if r["Status"] == "valid"],
-        "Risky": [r for r in results if r["Status"] == "catchall"],
-        "Bad": [r for r in results if r["Status"] == "invalid"]
-    }
-
-    for sheet_name, data in categories.items():
-        ws = wb.create_sheet(sheet_name)
-        ws.append(["Name", "Email", "Status", "Detail", "CheckedAt"])
-        for r in data:
-            ws.append([r.get("Name", ""), r.get("Email", ""), r.get("Status", ""), r.get("Detail", ""), r.get("CheckedAt", "")])
-
-    if "Sheet" in wb.sheetnames:
-        wb.remove(wb["Sheet"])
-
-    output = io.BytesIO()
-    wb.save(output)
-    output.seek(0)
-
-    stats["total"] = total
-    return stats, output
+    transcript.flush_all()
+
+    results = ResultStore()
+    results.extend(res for res in slots if res is not None)
+    stats["total"] = completed_count
+    return stats, results
+
+
+def coordinate(rows, queue_path, progress_id=None, cfg=None, shard_size=None, poll=1.0, deadline=None):
+    """
+    Coordinator mode: puts ``rows`` on the shard queue at ``queue_path`` and
+    merges what workers stream back into (stats, ResultStore), in input order.
+    Rows of shards that exhausted their retries are reported as unknown, and
+    so are rows still outstanding when the job deadline passes.
+
+    Pausing ``progress_id`` stops new shards from being handed out. When no
+    row comes back for "distributed_stall_seconds" while the job is running
+    (e.g. no worker is up), the progress status says so; the job keeps
+    waiting until workers appear, it is stopped, or its deadline passes.
+    """
+    if cfg is None:
+        cfg = load_settings()
+    ends_at = job_deadline(cfg, deadline)
+    stall_after = float(cfg.get("distributed_stall_seconds", 60))
+    stopped = False
+    paused = False
+    queue = ShardQueue(queue_path)
+    job_id = queue.submit(rows, shard_size or int(cfg.get("shard_size", DEFAULT_SHARD_SIZE)))
+    total = len(rows)
+    log.debug("Queued job %s: %s rows on %s", job_id, total, queue_path)
+    start_time = time.time()
+    last_done, last_change = -1, time.time()
+    warned_at = 0.0
+    while not queue.is_finished(job_id):
+        if ends_at is not None and time.time() >= ends_at:
+            log.debug("Deadline reached for job %s", job_id)
+            break
+        p = queue.progress(job_id)
+        done = p["verified"]
+        if done != last_done or paused:
+            last_done, last_change = done, time.time()
+        status_text = f"{p['done']}/{p['shards']} shards, {p['leased']} in progress"
+        stalled_for = time.time() - last_change
+        if stall_after and stalled_for >= stall_after:
+            status_text = f"Stalled: no results for {int(stalled_for)}s, {p['leased']} shards leased (is a worker running?)"
+            if time.time() - warned_at >= 60:
+                warned_at = time.time()
+                log.warning("Job %s stalled for %ss on %s", job_id, int(stalled_for), queue_path)
+        if progress_id:
+            control = state.get_control(progress_id)
+            if control == "stopped":
+                stopped = True
+                break
+            if (control == "paused") != paused:
+                paused = control == "paused"
+                (queue.pause if paused else queue.resume)(job_id)
+            state.set_progress(progress_id, {
+                "percent": int(done / max(1, total) * 100),
+                "verified": done,
+                "queue": total - done,
+                "state": "paused" if paused else "running",
+                "eta_seconds": max(1, int((time.time() - start_time) / max(1, done) * (total - done))),
+                "status_text": "Paused: no new shards handed out" if paused else status_text
+            })
+        time.sleep(poll)
+
+    merged = {idx: Result.from_dict(data) for idx, data in queue.results(job_id)}
+    for idx, row in queue.failed_rows(job_id):
+        merged[idx] = Result(row.get("Name", ""), row.get("Email", ""), "unknown", "shard_failed")
+    queue.purge(job_id)
+    if not stopped:
+        for idx, row in enumerate(rows):
+            if idx not in merged:
+                merged[idx] = deadline_result(row)
+
+    results = ResultStore()
+    stats = empty_stats()
+    for idx in sorted(merged):
+        results.append(merged[idx])
+        tally(stats, merged[idx])
+    stats["total"] = len(results)
+    return stats, results
+
+
+def run_worker(queue_path, worker=None, lease=DEFAULT_LEASE, exit_when_idle=False, idle_sleep=2.0):
+    """
+    Worker mode: leases shards from ``queue_path``, verifies them with this
+    process's own pool and streams results back in small batches while the
+    lease is kept alive by a heartbeat thread.
+    """
+    cfg = load_settings()
+    threads = resolve_threads(cfg)
+    worker = worker or worker_name()
+    queue = ShardQueue(queue_path)
+    log.info("Worker %s polling %s with %s threads", worker, queue_path, threads)
+    try:
+        while True:
+            claimed = queue.claim(worker, lease)
+            if claimed is None:
+                if exit_when_idle:
+                    return
+                time.sleep(idle_sleep)
+                continue
+            shard_id, job_id, items = claimed
+            log.debug("Worker %s took shard %s (%s rows)", worker, shard_id, len(items))
+
+            lost = threading.Event()
+            finished = threading.Event()
+
+            def keep_alive():
+                while not finished.wait(lease / 3):
+                    if not queue.heartbeat(shard_id, worker, lease):
+                        lost.set()
+                        return
+
+            hb = threading.Thread(target=keep_alive, daemon=True)
+            hb.start()
+            batch = []
+            rows = [dict(row, _index=idx) for idx, row in items]
+            try:
+                for row, res in iter_verify(rows, cfg, threads, with_rows=True):
+                    batch.append((row["_index"], res.to_dict()))
+                    if len(batch) >= 20:
+                        if not queue.put_results(job_id, shard_id, batch, worker):
+                            lost.set()
+                        batch = []
+                    if lost.is_set():
+                        log.warning("Worker %s lost lease on shard %s", worker, shard_id)
+                        break
+                # a lost lease (or purged job) means someone else owns these rows now
+                if batch and not lost.is_set():
+                    if not queue.put_results(job_id, shard_id, batch, worker):
+                        lost.set()
+                if not lost.is_set():
+                    queue.complete(shard_id, worker)
+            finally:
+                finished.set()
+                hb.join()
+    finally:
+        queue.release(worker)
+
+
+def main(csv_path, progress_id=None, orig_filename=None, deadline=None):
+    """
+    Verifies every address in ``csv_path`` and returns (stats, ResultStore).
+    Workbooks/CSVs are rendered from the store on demand (ResultStore.to_xlsx).
+    With "distributed_queue" set in settings.json the rows are sharded out to
+    worker nodes (``python check_email.py worker``) instead of verified here.
+    ``deadline`` is the job's time budget in seconds (see verify_rows).
+    """
+    cfg = load_settings()
+    rows = read_rows(csv_path)
+    if cfg.get("distributed_queue") and rows:
+        return coordinate(rows, cfg["distributed_queue"], progress_id=progress_id, cfg=cfg, deadline=deadline)
+    return verify_rows(rows, progress_id=progress_id, cfg=cfg, deadline=deadline)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="N+ email verifier engine")
+    sub = parser.add_subparsers(dest="mode", required=True)
+    p_verify = sub.add_parser("verify", help="verify a CSV in this process")
+    p_verify.add_argument("csv")
+    p_verify.add_argument("--record", metavar="TRACE", help="record DNS/SMTP conversations to this .ndjson.gz file")
+    p_verify.add_argument("--replay", metavar="TRACE", help="answer DNS/SMTP from a recorded trace instead of the network")
+    p_verify.add_argument("--speed", type=float, default=1.0, help="replay speed factor (0 = no waiting)")
+    p_verify.add_argument("--out", help="write the report here (.xlsx or .csv)")
+    p_verify.add_argument("--deadline", type=float, default=None, help="seconds; rows not done by then are reported unknown")
+    p_coord = sub.add_parser("coordinate", help="shard a CSV onto the queue and merge worker results")
+    p_coord.add_argument("csv")
+    p_coord.add_argument("--queue", required=True, help="path of the SQLite shard queue")
+    p_coord.add_argument("--shard-size", type=int, default=None)
+    p_coord.add_argument("--out", help="write the merged report here (.xlsx or .csv)")
+    p_coord.add_argument("--deadline", type=float, default=None, help="seconds; rows not done by then are reported unknown")
+    p_worker = sub.add_parser("worker", help="verify shards from the queue")
+    p_worker.add_argument("--queue", required=True, help="path of the SQLite shard queue")
+    p_worker.add_argument("--id", default=None, help="worker name (default host:pid)")
+    p_worker.add_argument("--lease", type=int, default=DEFAULT_LEASE, help="seconds before an unrenewed shard is re-queued")
+    p_worker.add_argument("--exit-when-idle", action="store_true")
+    args = parser.parse_args()
+
+    if args.mode == "worker":
+        run_worker(args.queue, worker=args.id, lease=args.lease, exit_when_idle=args.exit_when_idle)
+    else:
+        started = time.time()
+        rows = read_rows(args.csv)
+        if args.mode == "verify":
+            cfg = load_settings()
+            if args.record:
+                cfg["transcript_record"] = args.record
+            if args.replay:
+                cfg.update(transcript_replay=args.replay, replay_speed=args.speed)
+                transcript.reset_replay(cfg)
+            stats, results = verify_rows(rows, cfg=cfg, deadline=args.deadline)
+            transcript.close_all()
+        else:
+            stats, results = coordinate(rows, args.queue, shard_size=args.shard_size, deadline=args.deadline)
+        elapsed = time.time() - started
+        print(json.dumps(dict(stats, seconds=round(elapsed, 2), rows_per_sec=round(len(results) / max(elapsed, 1e-6), 1))))
+        if args.out:
+            data = results.to_csv() if args.out.lower().endswith(".csv") else results.to_xlsx()
+            with open(args.out, "wb") as f:
+                f.write(data.getvalue())
@@ -0,0 +1,114 @@
+# domain_state.py
+"""
+Per-job domain verdicts.
+
+A list often holds hundreds of addresses on a domain whose MX rejects every
+recipient, is unreachable on every host, or accepts everything. The tracker
+learns that from the first few addresses and answers the rest of the domain
+without DNS or SMTP, labelling those rows "inferred:<reason>". Thresholds
+come from settings.json (0 disables that inference):
+
+  infer_reject_after    addresses rejected (550) by every MX for a reason
+                        that is not about the one mailbox, none accepted;
+                        the verdict is only set once postmaster@ is
+                        rejected too
+  infer_timeout_after   addresses where every MX timed out / refused
+  infer_catchall_after  addresses on a domain proven catch-all
+"""
+import re
+import threading
+
+REJECT = "reject"
+TIMEOUT = "timeout"
+CATCHALL = "catchall"
+ACCEPT = "accept"
+
+# replies that reject one mailbox, which says nothing about the rest of the domain
+MAILBOX_REJECTION_RE = re.compile(
+    r"\b5\.1\.\d|user unknown|unknown user|no such user|nosuchuser|does not exist|"
+    r"mailbox (is )?unavailable|mailbox not found|unknown recipient|recipient not found|"
+    r"invalid recipient|address rejected|not a valid mailbox", re.I)
+
+REASONS = {
+    REJECT: "inferred:domain_rejects_all",
+    TIMEOUT: "inferred:all_mx_unreachable",
+    CATCHALL: "inferred:catch_all",
+}
+
+
+def is_mailbox_rejection(text):
+    return bool(MAILBOX_REJECTION_RE.search(text or ""))
+
+
+class DomainTracker:
+    def __init__(self, cfg=None):
+        cfg = cfg or {}
+        self.thresholds = {
+            REJECT: int(cfg.get("infer_reject_after", 5) or 0),
+            TIMEOUT: int(cfg.get("infer_timeout_after", 3) or 0),
+            CATCHALL: int(cfg.get("infer_catchall_after", 1) or 0),
+        }
+        self.inferred = 0
+        self._lock = threading.Lock()
+        self._counts = {}
+        self._accepted = set()
+        self._confirming = set()
+        self._verdicts = {}
+
+    def lookup(self, domain):
+        """(status, detail) for ``domain`` once a domain-wide outcome is established, else None."""
+        with self._lock:
+            verdict = self._verdicts.get(domain)
+            if verdict is not None:
+                self.inferred += 1
+            return verdict
+
+    def observe(self, domain, outcome, status):
+        """
+        Records how one address on ``domain`` ended: REJECT, TIMEOUT, CATCHALL,
+        ACCEPT or None (anything inconclusive), with the status it was given.
+
+        Returns True when a REJECT streak has reached its threshold: the caller
+        then has to probe the domain and report back through confirm_reject().
+        """
+        with self._lock:
+            if domain in self._verdicts:
+                return False
+            if outcome == ACCEPT:
+                # a real mailbox was accepted: rejections are per-address, not domain-wide
+                self._accepted.add(domain)
+                self._counts.pop(domain, None)
+                return False
+            counts = self._counts.setdefault(domain, {})
+            if outcome not in self.thresholds:
+                counts.pop(REJECT, None)
+                counts.pop(TIMEOUT, None)
+                return False
+            if outcome == REJECT and domain in self._accepted:
+                return False
+            # reject / timeout streaks must be unbroken to count as domain-wide
+            for other in (REJECT, TIMEOUT):
+                if other != outcome:
+                    counts.pop(other, None)
+            counts[outcome] = counts.get(outcome, 0) + 1
+            limit = self.thresholds[outcome]
+            if not limit or counts[outcome] < limit:
+                return False
+            if outcome == REJECT:
+                if domain in self._confirming:
+                    return False
+                self._confirming.add(domain)
+                return True
+            self._verdicts[domain] = (status, REASONS[outcome])
+            return False
+
+    def confirm_reject(self, domain, status, rejected):
+        """Settles a REJECT streak with the result of the domain-level probe."""
+        with self._lock:
+            self._confirming.discard(domain)
+            if rejected:
+                self._verdicts[domain] = (status, REASONS[REJECT])
+            else:
+                # the domain does accept mail; stop inferring rejections for it
+                self._accepted.add(domain)
+                self._counts.pop(domain, None)
@@ -1,3 +1,5 @@
 # globals.py
-progress_status = {}
-progress_lock = None
+from state_backend import get_backend
+
+# progress, control signals and lookup caches, shared by all workers (see state_backend.py)
+state = get_backend()
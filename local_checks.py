@@ -0,0 +1,126 @@
+# local_checks.py
+"""
+Pre-network classification of addresses.
+
+Everything here runs on in-memory indexes built once from data/ files, so
+malformed, disposable and role addresses are settled before verify_address
+spends a DNS lookup or an SMTP session on them.
+"""
+import os
+import re
+import threading
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+DISPOSABLE_DOMAINS = os.path.join(DATA_DIR, "disposable_domains.txt")
+ROLE_ACCOUNTS = os.path.join(DATA_DIR, "role_accounts.txt")
+
+# RFC 5322 dot-atom local part (atext runs separated by single dots)
+ATOM_RE = re.compile(r"^[A-Za-z0-9!#$%&'*+/=?^_`{|}~-]+(\.[A-Za-z0-9!#$%&'*+/=?^_`{|}~-]+)*$")
+# RFC 5322 quoted-string local part
+QUOTED_RE = re.compile(r'^"([\x20\x21\x23-\x5b\x5d-\x7e]|\\[\x20-\x7e])*"$')
+# RFC 1035 / 5890 hostname label (LDH, no leading/trailing hyphen)
+LABEL_RE = re.compile(r"^[a-z0-9]([a-z0-9-]{0,61}[a-z0-9])?$")
+ROLE_SPLIT_RE = re.compile(r"[._-]")
+
+_lock = threading.Lock()
+_indexes = {}
+
+
+def _load_list(path):
+    items = set()
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.split("#", 1)[0].strip().lower()
+                if line:
+                    items.add(line)
+    except FileNotFoundError:
+        pass
+    return frozenset(items)
+
+
+def _index(name, path):
+    idx = _indexes.get(name)
+    if idx is None:
+        with _lock:
+            idx = _indexes.get(name)
+            if idx is None:
+                idx = _indexes[name] = _load_list(path)
+    return idx
+
+
+def disposable_domains():
+    return _index("disposable", DISPOSABLE_DOMAINS)
+
+
+def role_accounts():
+    return _index("role", ROLE_ACCOUNTS)
+
+
+def syntax_error(email):
+    """Returns a short reason if ``email`` is not a deliverable RFC 5321 address, else None."""
+    if len(email) > 254:
+        return "too_long"
+    if email.count("@") != 1 and not email.startswith('"'):
+        return "at_sign"
+    local, sep, domain = email.rpartition("@")
+    if not sep or not local or not domain:
+        return "at_sign"
+    if len(local) > 64:
+        return "local_too_long"
+    if not (ATOM_RE.match(local) or QUOTED_RE.match(local)):
+        return "local_part"
+
+    if domain.startswith("["):
+        return "domain_literal"
+    try:
+        ascii_domain = domain.encode("idna").decode("ascii") if not domain.isascii() else domain
+    except UnicodeError:
+        return "domain_idna"
+    ascii_domain = ascii_domain.lower()
+    if len(ascii_domain) > 253:
+        return "domain_too_long"
+    labels = ascii_domain.split(".")
+    if len(labels) < 2:
+        return "domain_no_dot"
+    for label in labels:
+        if not LABEL_RE.match(label):
+            return "domain_label"
+    if labels[-1].isdigit():
+        return "numeric_tld"
+    return None
+
+
+def is_disposable(domain):
+    """True if ``domain`` or any parent of it is a known throw-away provider."""
+    index = disposable_domains()
+    labels = domain.split(".")
+    for i in range(len(labels) - 1):
+        if ".".join(labels[i:]) in index:
+            return True
+    return False
+
+
+def is_role(local):
+    index = role_accounts()
+    local = local.split("+", 1)[0]
+    # "no.reply" / "no_reply" / "noreply" are the same mailbox
+    return local in index or ROLE_SPLIT_RE.sub("", local) in index
+
+
+def classify(email, cfg=None):
+    """
+    Returns (status, detail) when the address can be decided locally, else None.
+
+    ``email`` must already be stripped and lower-cased.
+    """
+    cfg = cfg or {}
+    reason = syntax_error(email)
+    if reason:
+        return "invalid", f"bad_syntax:{reason}"
+    local, _, domain = email.rpartition("@")
+    if cfg.get("flag_disposable", True) and is_disposable(domain):
+        return "disposable", "disposable_domain"
+    if cfg.get("flag_role_accounts", True) and is_role(local):
+        return "role", "role_account"
+    return None
@@ -0,0 +1,99 @@
+# public_suffix.py
+"""
+Offline public-suffix lookup.
+
+Reads the bundled data/public_suffix_list.dat snapshot (never the network) so
+air-gapped workers and frozen builds split domains the same way every time.
+Refresh the snapshot by replacing the file with a newer copy of
+https://publicsuffix.org/list/public_suffix_list.dat; its "// VERSION:" header
+is exposed as ``snapshot_version()``.
+"""
+import os
+import threading
+from collections import namedtuple
+
+SUFFIX_LIST = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "public_suffix_list.dat")
+
+SplitDomain = namedtuple("SplitDomain", ["subdomain", "domain", "suffix"])
+
+_lock = threading.Lock()
+_loaded = None
+
+
+class SuffixList:
+    def __init__(self, path=SUFFIX_LIST, include_private=False):
+        self.version = ""
+        self.rules = set()
+        self.wildcards = set()
+        self.exceptions = set()
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line.startswith("// VERSION:"):
+                    self.version = line.split(":", 1)[1].strip()
+                if "===BEGIN PRIVATE DOMAINS===" in line and not include_private:
+                    break
+                if not line or line.startswith("//"):
+                    continue
+                rule = line.split()[0].lower()
+                if rule.startswith("!"):
+                    self._add(self.exceptions, rule[1:])
+                elif rule.startswith("*."):
+                    self._add(self.wildcards, rule[2:])
+                else:
+                    self._add(self.rules, rule)
+
+    @staticmethod
+    def _add(target, rule):
+        target.add(rule)
+        try:
+            # domains in email addresses arrive punycoded, the list is in unicode
+            puny = rule.encode("idna").decode("ascii")
+            if puny != rule:
+                target.add(puny)
+        except Exception:
+            pass
+
+    def suffix_length(self, labels):
+        """Number of trailing labels that form the public suffix (0 if unknown TLD)."""
+        n = len(labels)
+        for i in range(n):
+            candidate = ".".join(labels[i:])
+            if candidate in self.exceptions:
+                return n - i - 1
+            if candidate in self.rules:
+                return n - i
+            if i + 1 < n and ".".join(labels[i + 1:]) in self.wildcards:
+                return n - i
+        return 0
+
+    def split(self, domain):
+        domain = domain.strip().strip(".").lower()
+        if not domain:
+            return SplitDomain("", "", "")
+        labels = domain.split(".")
+        k = self.suffix_length(labels)
+        suffix_labels = labels[len(labels) - k:] if k else []
+        rest = labels[:len(labels) - k]
+        if not rest:
+            return SplitDomain("", "", ".".join(suffix_labels))
+        return SplitDomain(".".join(rest[:-1]), rest[-1], ".".join(suffix_labels))
+
+
+def get_suffix_list():
+    """Parses the snapshot once per process, on first use."""
+    global _loaded
+    if _loaded is None:
+        with _lock:
+            if _loaded is None:
+                _loaded = SuffixList()
+    return _loaded
+
+
+def extract(domain):
+    """Drop-in for tldextract.extract(): returns (subdomain, domain, suffix)."""
+    return get_suffix_list().split(domain)
+
+
+def snapshot_version():
+    return get_suffix_list().version
@@ -0,0 +1,321 @@
+# results.py
+"""
+Compact verification results.
+
+``Result`` is a ``__slots__`` record (status as a small IntEnum, detail
+interned, timestamp as a float) that still answers ``res["Status"]`` /
+``res.get("Email")`` like the old five-key dicts.  ``ResultStore`` keeps a
+whole job column-wise (arrays for statuses/timestamps, a dictionary-encoded
+detail column) and is what gets persisted next to each history entry; XLSX,
+CSV and filtered exports are rendered from it on request.
+"""
+import csv
+import gzip
+import io
+import json
+import sys
+import time
+from array import array
+from datetime import datetime
+from enum import IntEnum
+
+FIELDS = ["Name", "Email", "Status", "Detail", "CheckedAt"]
+STORE_VERSION = 1
+
+
+class Status(IntEnum):
+    VALID = 0
+    CATCHALL = 1
+    INVALID = 2
+    UNKNOWN = 3
+    DISPOSABLE = 4
+    ROLE = 5
+
+    def __str__(self):
+        return self.name.lower()
+
+    @classmethod
+    def of(cls, value):
+        if isinstance(value, cls):
+            return value
+        try:
+            return cls[str(value).upper()]
+        except KeyError:
+            return cls.INVALID
+
+
+# workbook sheets and the statuses they hold
+SHEETS = {
+    "Valid": (Status.VALID,),
+    "Risky": (Status.CATCHALL, Status.ROLE),
+    "Bad": (Status.INVALID, Status.DISPOSABLE),
+    "Unknown": (Status.UNKNOWN,),
+}
+# sheets written even when they have no rows
+FIXED_SHEETS = ("Valid", "Risky", "Bad")
+
+
+def iso(ts):
+    return datetime.utcfromtimestamp(ts).isoformat() if ts else ""
+
+
+def parse_iso(value):
+    if not value:
+        return 0.0
+    if isinstance(value, datetime):
+        return (value - datetime(1970, 1, 1)).total_seconds()
+    try:
+        return (datetime.fromisoformat(str(value)) - datetime(1970, 1, 1)).total_seconds()
+    except ValueError:
+        return 0.0
+
+
+class Result:
+    __slots__ = ("name", "email", "status", "detail", "checked_at")
+
+    def __init__(self, name="", email="", status=Status.UNKNOWN, detail="", checked_at=None):
+        self.name = name
+        self.email = email
+        self.status = Status.of(status)
+        self.detail = sys.intern(detail) if detail else ""
+        self.checked_at = time.time() if checked_at is None else checked_at
+
+    # dict-style access so callers written against the old result dicts keep working
+    def __getitem__(self, key):
+        if key == "Name":
+            return self.name
+        if key == "Email":
+            return self.email
+        if key == "Status":
+            return str(self.status)
+        if key == "Detail":
+            return self.detail
+        if key == "CheckedAt":
+            return iso(self.checked_at)
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key == "Name":
+            self.name = value
+        elif key == "Email":
+            self.email = value
+        elif key == "Status":
+            self.status = Status.of(value)
+        elif key == "Detail":
+            self.detail = sys.intern(value) if value else ""
+        elif key == "CheckedAt":
+            self.checked_at = value if isinstance(value, float) else parse_iso(value)
+        else:
+            raise KeyError(key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def copy(self, **changes):
+        res = Result(self.name, self.email, self.status, self.detail, self.checked_at)
+        for k, v in changes.items():
+            res[k] = v
+        return res
+
+    def to_dict(self):
+        return {k: self[k] for k in FIELDS}
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d.get("Name", ""), d.get("Email", ""), d.get("Status", "invalid"),
+                   d.get("Detail", ""), parse_iso(d.get("CheckedAt")))
+
+    def __repr__(self):
+        return f"Result({self.email!r}, {self.status}, {self.detail!r})"
+
+
+class ResultStore:
+    """Column-oriented result set for one job."""
+
+    def __init__(self):
+        self.names = []
+        self.emails = []
+        self.statuses = array("B")
+        self.details = array("I")
+        self.checked_at = array("d")
+        self.detail_table = [""]
+        self._detail_index = {"": 0}
+
+    def __len__(self):
+        return len(self.emails)
+
+    def append(self, res):
+        if not isinstance(res, Result):
+            res = Result.from_dict(res)
+        idx = self._detail_index.get(res.detail)
+        if idx is None:
+            idx = self._detail_index[res.detail] = len(self.detail_table)
+            self.detail_table.append(res.detail)
+        self.names.append(res.name)
+        self.emails.append(res.email)
+        self.statuses.append(int(res.status))
+        self.details.append(idx)
+        self.checked_at.append(res.checked_at)
+
+    def extend(self, results):
+        for res in results:
+            self.append(res)
+
+    def record(self, i):
+        return Result(self.names[i], self.emails[i], Status(self.statuses[i]),
+                      self.detail_table[self.details[i]], self.checked_at[i])
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.record(i)
+
+    def select(self, statuses=None):
+        """Yields records whose status is in ``statuses`` (names or Status values); all if None."""
+        wanted = None if statuses is None else {int(Status.of(s)) for s in statuses}
+        for i, st in enumerate(self.statuses):
+            if wanted is None or st in wanted:
+                yield self.record(i)
+
+    def stats(self):
+        stats = {str(s): 0 for s in Status}
+        for st in self.statuses:
+            stats[str(Status(st))] += 1
+        stats["total"] = len(self)
+        return stats
+
+    # ---- persistence ----
+    def save(self, path):
+        payload = {
+            "version": STORE_VERSION,
+            "statuses": [str(s) for s in Status],
+            "detail_table": self.detail_table,
+            "columns": {
+                "name": self.names,
+                "email": self.emails,
+                "status": self.statuses.tolist(),
+                "detail": self.details.tolist(),
+                "checked_at": self.checked_at.tolist(),
+            },
+        }
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, path):
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            payload = json.load(f)
+        store = cls()
+        cols = payload["columns"]
+        # statuses are stored by position; remap in case the enum gained members since
+        remap = [int(Status.of(name)) for name in payload.get("statuses", [])]
+        store.names = cols["name"]
+        store.emails = cols["email"]
+        store.statuses = array("B", (remap[s] if s < len(remap) else s for s in cols["status"]))
+        store.details = array("I", cols["detail"])
+        store.checked_at = array("d", cols["checked_at"])
+        store.detail_table = payload["detail_table"]
+        store._detail_index = {d: i for i, d in enumerate(store.detail_table)}
+        return store
+
+    @classmethod
+    def from_xlsx(cls, path):
+        """Rebuilds a store from a workbook written before result files existed."""
+        from openpyxl import load_workbook
+        store = cls()
+        wb = load_workbook(path, read_only=True)
+        for ws in wb.worksheets:
+            rows = ws.iter_rows(values_only=True)
+            header = next(rows, None)
+            if not header or "Email" not in header:
+                continue
+            cols = {name: i for i, name in enumerate(header)}
+            for row in rows:
+                values = {k: row[i] if i < len(row) else "" for k, i in cols.items()}
+                if values.get("Email"):
+                    store.append({k: v if v is not None else "" for k, v in values.items()})
+        wb.close()
+        return store
+
+    # ---- exports ----
+    def to_xlsx(self, statuses=None):
+        """Valid / Risky / Bad workbook (optionally restricted to ``statuses``) as BytesIO."""
+        from openpyxl import Workbook
+        wanted = None if statuses is None else {Status.of(s) for s in statuses}
+        wb = Workbook(write_only=True)
+        present = set(self.statuses)
+        for sheet_name, members in SHEETS.items():
+            members = [s for s in members if wanted is None or s in wanted]
+            if not members or (sheet_name not in FIXED_SHEETS and not present.intersection(members)):
+                continue
+            ws = wb.create_sheet(sheet_name)
+            ws.append(FIELDS)
+            for r in self.select(members):
+                ws.append([r.name, r.email, str(r.status), r.detail, iso(r.checked_at)])
+        if not wb.worksheets:
+            wb.create_sheet("Results").append(FIELDS)
+        output = io.BytesIO()
+        wb.save(output)
+        output.seek(0)
+        return output
+
+    def to_csv(self, statuses=None):
+        text = io.StringIO()
+        w = csv.writer(text)
+        w.writerow(FIELDS)
+        for r in self.select(statuses):
+            w.writerow([r.name, r.email, str(r.status), r.detail, iso(r.checked_at)])
+        return io.BytesIO(text.getvalue().encode("utf-8"))
+
+
+# details that mean the server never gave a definite answer (or the verdict was inferred)
+RETRY_MARKERS = ("temp_error", "risky:", "err:", "inferred:")
+
+
+def is_stale(status, detail, checked_at, cutoff):
+    return (checked_at < cutoff
+            or status in (Status.CATCHALL, Status.UNKNOWN)
+            or any(m in detail for m in RETRY_MARKERS))
+
+
+def plan_refresh(previous, new_rows=(), ttl_seconds=30 * 86400, now=None):
+    """
+    Picks the rows a refresh of ``previous`` has to send to the engine: addresses
+    in ``new_rows`` that the job never saw, plus previous rows that are older
+    than ``ttl_seconds``, catch-all/unknown, or ended on a temporary failure.
+    """
+    cutoff = (now or time.time()) - ttl_seconds
+    seen = set()
+    todo = []
+    for i, email in enumerate(previous.emails):
+        key = email.strip().lower()
+        if key in seen:
+            continue
+        seen.add(key)
+        if is_stale(previous.statuses[i], previous.detail_table[previous.details[i]], previous.checked_at[i], cutoff):
+            todo.append({"Name": previous.names[i], "Email": email})
+    for row in new_rows:
+        key = row["Email"].strip().lower()
+        if key not in seen:
+            seen.add(key)
+            todo.append(row)
+    return todo
+
+
+def merge_refresh(previous, fresh, new_rows=()):
+    """Previous rows (re-verified ones replaced by ``fresh``) followed by addresses new in ``new_rows``."""
+    by_email = {r.email.strip().lower(): r for r in fresh}
+    merged = ResultStore()
+    seen = set()
+    for i, email in enumerate(previous.emails):
+        key = email.strip().lower()
+        seen.add(key)
+        merged.append(by_email.get(key) or previous.record(i))
+    for row in new_rows:
+        key = row["Email"].strip().lower()
+        if key not in seen and key in by_email:
+            seen.add(key)
+            merged.append(by_email[key])
+    return merged
@@ -0,0 +1,201 @@
+# shard_queue.py
+"""
+Durable shard queue for distributed verification.
+
+A coordinator splits a job into domain-affine shards (every address of a
+domain lands in the same shard unless the domain alone is larger than a
+shard) and stores them in one SQLite file. Workers on this or other hosts
+that can reach the file lease shards, stream results back row by row and
+mark them done. A lease that is not renewed expires, so a crashed worker only
+puts back the shards it was holding.
+"""
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+DEFAULT_SHARD_SIZE = 200
+DEFAULT_LEASE = 120
+MAX_ATTEMPTS = 5
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def domain_of(row):
+    return (row.get("Email") or "").rsplit("@", 1)[-1].strip().lower()
+
+
+def make_shards(rows, shard_size=DEFAULT_SHARD_SIZE):
+    """
+    Groups (index, row) pairs by domain and packs whole domains into shards of
+    at most ``shard_size`` rows; a domain bigger than that gets shards of its own.
+    """
+    by_domain = OrderedDict()
+    for i, row in enumerate(rows):
+        by_domain.setdefault(domain_of(row), []).append((i, row))
+
+    shards, current = [], []
+    for domain, items in sorted(by_domain.items(), key=lambda kv: -len(kv[1])):
+        if len(items) >= shard_size:
+            for start in range(0, len(items), shard_size):
+                shards.append(items[start:start + shard_size])
+            continue
+        if len(current) + len(items) > shard_size:
+            shards.append(current)
+            current = []
+        current.extend(items)
+    if current:
+        shards.append(current)
+    return shards
+
+
+class ShardQueue:
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        db = self._conn()
+        db.execute("CREATE TABLE IF NOT EXISTS jobs (job_id TEXT PRIMARY KEY, created REAL NOT NULL, total INTEGER NOT NULL, shards INTEGER NOT NULL)")
+        db.execute("""CREATE TABLE IF NOT EXISTS shards (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, job_id TEXT NOT NULL, rows TEXT NOT NULL,
+            state TEXT NOT NULL DEFAULT 'pending', worker TEXT, lease_until REAL, attempts INTEGER NOT NULL DEFAULT 0)""")
+        db.execute("CREATE INDEX IF NOT EXISTS shards_state ON shards (state, lease_until)")
+        db.execute("""CREATE TABLE IF NOT EXISTS results (
+            job_id TEXT NOT NULL, row_index INTEGER NOT NULL, shard_id INTEGER NOT NULL, data TEXT NOT NULL,
+            PRIMARY KEY (job_id, row_index))""")
+        db.execute("CREATE TABLE IF NOT EXISTS paused_jobs (job_id TEXT PRIMARY KEY)")
+
+    def _conn(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    def _tx(self):
+        db = self._conn()
+        db.execute("BEGIN IMMEDIATE")
+        return db
+
+    # ---- coordinator side ----
+    def submit(self, rows, shard_size=DEFAULT_SHARD_SIZE, job_id=None):
+        job_id = job_id or uuid.uuid4().hex[:12]
+        shards = make_shards(rows, shard_size)
+        db = self._tx()
+        try:
+            db.execute("INSERT INTO jobs (job_id, created, total, shards) VALUES (?, ?, ?, ?)",
+                       (job_id, time.time(), len(rows), len(shards)))
+            db.executemany("INSERT INTO shards (job_id, rows) VALUES (?, ?)",
+                           [(job_id, json.dumps(shard)) for shard in shards])
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+        return job_id
+
+    def progress(self, job_id):
+        db = self._conn()
+        job = db.execute("SELECT total, shards FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if not job:
+            return None
+        counts = dict(db.execute("SELECT state, COUNT(*) FROM shards WHERE job_id = ? GROUP BY state", (job_id,)).fetchall())
+        done_rows = db.execute("SELECT COUNT(*) FROM results WHERE job_id = ?", (job_id,)).fetchone()[0]
+        return {"total": job[0], "shards": job[1], "verified": done_rows,
+                "pending": counts.get("pending", 0), "leased": counts.get("leased", 0),
+                "done": counts.get("done", 0), "failed": counts.get("failed", 0)}
+
+    def is_finished(self, job_id):
+        p = self.progress(job_id)
+        return p is not None and p["done"] + p["failed"] == p["shards"]
+
+    def results(self, job_id, after=-1):
+        """(row_index, result dict) pairs streamed back so far, in row order."""
+        for idx, data in self._conn().execute(
+                "SELECT row_index, data FROM results WHERE job_id = ? AND row_index > ? ORDER BY row_index", (job_id, after)):
+            yield idx, json.loads(data)
+
+    def failed_rows(self, job_id):
+        """(row_index, row) pairs of shards that ran out of attempts and have no result."""
+        done = {idx for idx, _ in self.results(job_id)}
+        for (rows,) in self._conn().execute("SELECT rows FROM shards WHERE job_id = ? AND state = 'failed'", (job_id,)):
+            for idx, row in json.loads(rows):
+                if idx not in done:
+                    yield idx, row
+
+    def pause(self, job_id):
+        """Stops handing out the job's shards; shards already leased run to completion."""
+        self._conn().execute("INSERT OR IGNORE INTO paused_jobs (job_id) VALUES (?)", (job_id,))
+
+    def resume(self, job_id):
+        self._conn().execute("DELETE FROM paused_jobs WHERE job_id = ?", (job_id,))
+
+    def purge(self, job_id):
+        db = self._tx()
+        for table in ("results", "shards", "paused_jobs", "jobs"):
+            db.execute(f"DELETE FROM {table} WHERE job_id = ?", (job_id,))
+        db.execute("COMMIT")
+
+    # ---- worker side ----
+    def claim(self, worker, lease=DEFAULT_LEASE):
+        """Leases the oldest pending (or lease-expired) shard; returns (shard_id, job_id, [(index, row)]) or None."""
+        now = time.time()
+        db = self._tx()
+        try:
+            db.execute("UPDATE shards SET state = 'failed' WHERE state = 'leased' AND lease_until < ? AND attempts >= ?",
+                       (now, MAX_ATTEMPTS))
+            row = db.execute("""SELECT id, job_id, rows FROM shards
+                                WHERE (state = 'pending' OR (state = 'leased' AND lease_until < ?))
+                                  AND job_id NOT IN (SELECT job_id FROM paused_jobs)
+                                ORDER BY id LIMIT 1""", (now,)).fetchone()
+            if row is None:
+                db.execute("COMMIT")
+                return None
+            db.execute("UPDATE shards SET state = 'leased', worker = ?, lease_until = ?, attempts = attempts + 1 WHERE id = ?",
+                       (worker, now + lease, row[0]))
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+        return row[0], row[1], [tuple(item) for item in json.loads(row[2])]
+
+    def heartbeat(self, shard_id, worker, lease=DEFAULT_LEASE):
+        """Extends the lease; False if the shard was taken over (our lease had expired)."""
+        cur = self._conn().execute("UPDATE shards SET lease_until = ? WHERE id = ? AND worker = ? AND state = 'leased'",
+                                   (time.time() + lease, shard_id, worker))
+        return cur.rowcount == 1
+
+    def put_results(self, job_id, shard_id, items, worker):
+        """
+        Stores [(row_index, result dict)] while ``worker`` still holds the shard;
+        a re-run of a shard simply overwrites its rows. False (nothing written)
+        if the lease was lost or the job has been purged.
+        """
+        db = self._tx()
+        try:
+            held = db.execute("SELECT 1 FROM shards WHERE id = ? AND job_id = ? AND worker = ? AND state = 'leased'",
+                              (shard_id, job_id, worker)).fetchone()
+            if held:
+                db.executemany("INSERT OR REPLACE INTO results (job_id, row_index, shard_id, data) VALUES (?, ?, ?, ?)",
+                               [(job_id, idx, shard_id, json.dumps(data)) for idx, data in items])
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+        return bool(held)
+
+    def complete(self, shard_id, worker):
+        self._conn().execute("UPDATE shards SET state = 'done', lease_until = NULL WHERE id = ? AND worker = ?",
+                             (shard_id, worker))
+
+    def release(self, worker):
+        """Hands every shard ``worker`` holds back to the queue (clean shutdown / operator action)."""
+        cur = self._conn().execute("UPDATE shards SET state = 'pending', worker = NULL, lease_until = NULL WHERE worker = ? AND state = 'leased'",
+                                   (worker,))
+        return cur.rowcount
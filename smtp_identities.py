@@ -0,0 +1,178 @@
+# smtp_identities.py
+"""
+Outbound SMTP identities.
+
+Every probe used to leave from the host's default address with the same
+HELO name, so remote MXs saw all of a node's traffic as one client and
+throttled it. "smtp_identities" in settings.json lists the local bind
+addresses and matching HELO names to spread connections over:
+
+  "smtp_identities": [
+    {"source": "203.0.113.10", "helo": "mx1.example.com", "rate": 5},
+    {"source": "203.0.113.11", "helo": "mx2.example.com"}
+  ]
+
+Each identity has its own token bucket ("rate" connections per second,
+default "identity_rate", 0 = unlimited) and a health record. A block is a
+421/554, 5.7.x or blocklist reply to the greeting or MAIL FROM; at RCPT, where
+554 and 5.7.x are usually about the recipient, only 421 and wording about the
+client's reputation count. An identity that gets "identity_block_after"
+blocks in a row is retired for "identity_retire_seconds" and then put back on
+probation, unless it is the only one. Without the setting a single identity
+with the default source address and "helo_name" is used.
+"""
+import json
+import logging
+import smtplib
+import threading
+import time
+
+log = logging.getLogger("check_email")
+
+BLOCK_CODES = (421, 554)
+BLOCK_MARKERS = ("5.7.", "blocked", "blacklist", "blocklist", "spamhaus", "reputation", "too many connections", "rate limit")
+# at RCPT only these name the client; anything else is a verdict on the recipient
+CLIENT_MARKERS = ("spamhaus", "client host", "blocked using", "reputation", "too many connections")
+
+
+def is_block(code, msg):
+    """True if an SMTP reply says the client (not the recipient) is unwelcome."""
+    try:
+        code = int(code)
+    except (TypeError, ValueError):
+        return False
+    if code in BLOCK_CODES:
+        return True
+    if code < 400:
+        return False
+    if isinstance(msg, bytes):
+        msg = msg.decode("utf-8", "replace")
+    msg = (msg or "").lower()
+    return any(m in msg for m in BLOCK_MARKERS)
+
+
+def is_client_block(code, msg):
+    """is_block() for a RCPT reply: only 421 or explicit client-reputation wording."""
+    try:
+        code = int(code)
+    except (TypeError, ValueError):
+        return False
+    if code == 421:
+        return True
+    if code < 400:
+        return False
+    if isinstance(msg, bytes):
+        msg = msg.decode("utf-8", "replace")
+    msg = (msg or "").lower()
+    return any(m in msg for m in CLIENT_MARKERS)
+
+
+class Blocked(smtplib.SMTPResponseException):
+    """The remote server refused the identity (source address / HELO), not the recipient."""
+
+
+class Identity:
+    def __init__(self, source=None, helo="yourdomain.com", rate=0):
+        self.source = source or None
+        self.helo = helo
+        self.rate = float(rate)
+        self.tokens = max(1.0, self.rate)
+        self.refilled = time.monotonic()
+        self.blocks = 0
+        self.retired_until = 0.0
+        self.sent = 0
+
+    @property
+    def source_address(self):
+        return (self.source, 0) if self.source else None
+
+    def _refill(self, now):
+        if self.rate > 0:
+            self.tokens = min(max(1.0, self.rate), self.tokens + (now - self.refilled) * self.rate)
+        else:
+            self.tokens = 1.0
+        self.refilled = now
+
+    def __repr__(self):
+        return f"Identity({self.source or 'default'}, {self.helo!r})"
+
+
+class IdentityPool:
+    def __init__(self, cfg):
+        rate = cfg.get("identity_rate", 0)
+        entries = cfg.get("smtp_identities") or [{}]
+        self.identities = [Identity(e.get("source"), e.get("helo") or cfg.get("helo_name", "yourdomain.com"),
+                                    e.get("rate", rate))
+                           for e in entries]
+        self.block_after = int(cfg.get("identity_block_after", 3))
+        self.retire_seconds = float(cfg.get("identity_retire_seconds", 900))
+        self._lock = threading.Lock()
+        self._next = 0
+
+    def acquire(self, avoid=()):
+        """
+        Waits for an active identity with a free token and returns it
+        (round-robin across identities), skipping those in ``avoid`` while any
+        other one is active.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                active = [i for i in self.identities if i.retired_until <= now]
+                untried = [i for i in active if i not in avoid]
+                if untried:
+                    active = untried
+                if not active:
+                    # everything is retired: keep working through the one that comes back first
+                    active = [min(self.identities, key=lambda i: i.retired_until)]
+                wait_for = None
+                for step in range(len(active)):
+                    ident = active[(self._next + step) % len(active)]
+                    ident._refill(now)
+                    if ident.tokens >= 1.0:
+                        ident.tokens -= 1.0
+                        ident.sent += 1
+                        self._next = (self._next + step + 1) % len(active)
+                        return ident
+                    need = (1.0 - ident.tokens) / ident.rate
+                    wait_for = need if wait_for is None else min(wait_for, need)
+            time.sleep(min(wait_for or 0.05, 0.5))
+
+    def report(self, ident, error=None):
+        """Feeds one dialogue's outcome (``error`` if it raised) back into ``ident``'s health."""
+        with self._lock:
+            if not isinstance(error, Blocked):
+                if error is None:
+                    ident.blocks = 0
+                return
+            ident.blocks += 1
+            if len(self.identities) < 2:
+                # retiring the only identity would just stall every probe
+                return
+            if self.block_after and ident.blocks >= self.block_after and ident.retired_until <= time.monotonic():
+                ident.retired_until = time.monotonic() + self.retire_seconds
+                ident.blocks = 0
+                log.warning("Retiring SMTP identity %s for %ss after repeated blocks (last: %s %s)",
+                            ident, int(self.retire_seconds), error.smtp_code, error.smtp_error)
+
+    def snapshot(self):
+        now = time.monotonic()
+        with self._lock:
+            return [{"source": i.source, "helo": i.helo, "sent": i.sent, "blocks": i.blocks,
+                     "retired_for": max(0, int(i.retired_until - now))} for i in self.identities]
+
+
+_lock = threading.Lock()
+_pools = {}
+
+
+def pool_for(cfg):
+    """The process-wide pool for the identity settings in ``cfg`` (rebuilt when they change)."""
+    key = json.dumps([cfg.get(k) for k in ("smtp_identities", "helo_name", "identity_rate",
+                                           "identity_block_after", "identity_retire_seconds")],
+                     sort_keys=True, default=str)
+    with _lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = IdentityPool(cfg)
+        return pool
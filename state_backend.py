@@ -0,0 +1,179 @@
+# state_backend.py
+"""
+Job state shared by every process serving the app.
+
+gunicorn runs several workers, and /progress/<pid> or /control/<pid>/stop can
+land on one that never saw the job, so progress, control signals and the
+DNS / catch-all / result caches live behind a small backend interface:
+
+  MemoryBackend  per-process dicts (single worker, desktop build, scripts)
+  SQLiteBackend  one WAL-mode SQLite file on local disk, visible to every
+                 worker on the host, no external service needed
+
+Pick one with "state_backend" ("sqlite" / "memory") and "state_path" in
+settings.json, or the VERIFIER_STATE_BACKEND / VERIFIER_STATE_PATH env vars.
+"""
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+DEFAULT_PATH = os.path.join(tempfile.gettempdir(), "verifier_state.sqlite3")
+# progress/control rows of finished jobs are dropped after this long
+STATE_RETENTION = 2 * 86400
+# expired cache rows (and old progress/control rows) are purged every this many cache writes
+PURGE_EVERY = 1000
+
+
+class MemoryBackend:
+    shared = False
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._progress = {}
+        self._control = {}
+        self._cache = {}
+
+    def get_progress(self, pid):
+        with self._lock:
+            return dict(self._progress.get(pid, {}))
+
+    def set_progress(self, pid, data):
+        with self._lock:
+            self._progress[pid] = dict(data)
+
+    def update_progress(self, pid, **fields):
+        with self._lock:
+            self._progress.setdefault(pid, {}).update(fields)
+
+    def get_control(self, pid):
+        with self._lock:
+            return self._control.get(pid)
+
+    def set_control(self, pid, state):
+        with self._lock:
+            self._control[pid] = state
+
+    def cache_get(self, ns, key):
+        with self._lock:
+            item = self._cache.get((ns, key))
+        if item is None or item[0] < time.time():
+            return None
+        return item
+
+    def cache_set(self, ns, key, value, ttl):
+        with self._lock:
+            self._cache[(ns, key)] = (time.time() + ttl, value)
+
+
+class SQLiteBackend:
+    shared = True
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        self._writes_lock = threading.Lock()
+        with self._conn() as db:
+            db.execute("CREATE TABLE IF NOT EXISTS progress (pid TEXT PRIMARY KEY, data TEXT NOT NULL, updated REAL NOT NULL)")
+            db.execute("CREATE TABLE IF NOT EXISTS control (pid TEXT PRIMARY KEY, state TEXT NOT NULL, updated REAL NOT NULL)")
+            db.execute("CREATE TABLE IF NOT EXISTS cache (ns TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, expires REAL NOT NULL, PRIMARY KEY (ns, key))")
+        self.purge()
+
+    def purge(self):
+        """Drops expired cache rows and progress/control rows of long-finished jobs."""
+        db = self._conn()
+        cutoff = time.time() - STATE_RETENTION
+        db.execute("DELETE FROM progress WHERE updated < ?", (cutoff,))
+        db.execute("DELETE FROM control WHERE updated < ?", (cutoff,))
+        db.execute("DELETE FROM cache WHERE expires < ?", (time.time(),))
+
+    def _conn(self):
+        # one connection per thread; sqlite3 connections are not thread-safe
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    def get_progress(self, pid):
+        row = self._conn().execute("SELECT data FROM progress WHERE pid = ?", (pid,)).fetchone()
+        return json.loads(row[0]) if row else {}
+
+    def set_progress(self, pid, data):
+        self._conn().execute("INSERT OR REPLACE INTO progress (pid, data, updated) VALUES (?, ?, ?)",
+                             (pid, json.dumps(data), time.time()))
+
+    def update_progress(self, pid, **fields):
+        db = self._conn()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            row = db.execute("SELECT data FROM progress WHERE pid = ?", (pid,)).fetchone()
+            data = json.loads(row[0]) if row else {}
+            data.update(fields)
+            db.execute("INSERT OR REPLACE INTO progress (pid, data, updated) VALUES (?, ?, ?)",
+                       (pid, json.dumps(data), time.time()))
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+
+    def get_control(self, pid):
+        row = self._conn().execute("SELECT state FROM control WHERE pid = ?", (pid,)).fetchone()
+        return row[0] if row else None
+
+    def set_control(self, pid, state):
+        self._conn().execute("INSERT OR REPLACE INTO control (pid, state, updated) VALUES (?, ?, ?)",
+                             (pid, state, time.time()))
+
+    def cache_get(self, ns, key):
+        row = self._conn().execute("SELECT expires, value FROM cache WHERE ns = ? AND key = ? AND expires >= ?",
+                                   (ns, key, time.time())).fetchone()
+        return (row[0], json.loads(row[1])) if row else None
+
+    def cache_set(self, ns, key, value, ttl):
+        self._conn().execute("INSERT OR REPLACE INTO cache (ns, key, value, expires) VALUES (?, ?, ?, ?)",
+                             (ns, key, json.dumps(value), time.time() + ttl))
+        with self._writes_lock:
+            self._writes += 1
+            due = self._writes % PURGE_EVERY == 0
+        if due:
+            self.purge()
+
+
+def _configured():
+    cfg = {}
+    try:
+        with open("settings.json", "r", encoding="utf-8") as f:
+            cfg = json.load(f)
+    except Exception:
+        pass
+    kind = os.environ.get("VERIFIER_STATE_BACKEND") or cfg.get("state_backend") or "sqlite"
+    path = os.environ.get("VERIFIER_STATE_PATH") or cfg.get("state_path") or DEFAULT_PATH
+    return kind.lower(), path
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """The process-wide backend, created on first use from settings/env."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                kind, path = _configured()
+                if kind == "memory":
+                    _backend = MemoryBackend()
+                else:
+                    try:
+                        _backend = SQLiteBackend(path)
+                    except sqlite3.Error:
+                        # unwritable state path: fall back to per-process state rather than failing to boot
+                        _backend = MemoryBackend()
+    return _backend
@@ -0,0 +1,204 @@
+# transcript.py
+"""
+Record / replay of the engine's network conversations.
+
+Recording ("transcript_record": path in settings.json) appends one JSON line
+per event to a gzip file while a real job runs:
+
+  {"k": "mx", "domain": ..., "hosts": [...], "ms": ...}
+  {"k": "catchall", "domain": ..., "verdict": true, "ms": ...}
+  {"k": "smtp", "host": ..., "rcpt": ..., "code": 250, "msg": "...", "ms": ...}
+  {"k": "smtp", "host": ..., "rcpt": ..., "error": "TimeoutError", "args": [...], "ms": ...}
+
+Replaying ("transcript_replay": path, "replay_speed": 1.0) answers the same
+questions from the file instead of the network, sleeping ``ms / speed``
+(speed 0 = no waiting), so a recorded job can be re-run offline to compare
+throughput and verdicts between engine versions.
+"""
+import atexit
+import builtins
+import gzip
+import json
+import logging
+import re
+import smtplib
+import threading
+import time
+from collections import defaultdict
+import smtp_identities
+
+log = logging.getLogger("check_email")
+
+TRANSCRIPT_VERSION = 1
+# catch-all probes use a throw-away local part; match them by domain only
+PROBE_RE = re.compile(r"^nonexist_\d+@")
+FLUSH_EVERY = 200
+
+
+def rcpt_key(email):
+    return PROBE_RE.sub("nonexist_*@", email.lower())
+
+
+def _exception_class(name):
+    cls = getattr(smtplib, name, None) or getattr(smtp_identities, name, None) or getattr(builtins, name, None)
+    return cls if isinstance(cls, type) and issubclass(cls, BaseException) else OSError
+
+
+def _jsonable(value):
+    if isinstance(value, bytes):
+        return value.decode("utf-8", "replace")
+    if isinstance(value, (str, int, float, type(None))):
+        return value
+    return str(value)
+
+
+class Recorder:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._f = gzip.open(path, "at", encoding="utf-8")
+        self._write({"k": "meta", "version": TRANSCRIPT_VERSION, "started": time.time()})
+
+    def _write(self, event):
+        line = json.dumps(event, ensure_ascii=False, separators=(",", ":")) + "\n"
+        with self._lock:
+            self._f.write(line)
+            self._pending += 1
+            if self._pending >= FLUSH_EVERY:
+                self._f.flush()
+                self._pending = 0
+
+    def mx(self, domain, hosts, ms):
+        self._write({"k": "mx", "domain": domain, "hosts": hosts, "ms": round(ms, 1)})
+
+    def catchall(self, domain, verdict, ms):
+        self._write({"k": "catchall", "domain": domain, "verdict": verdict, "ms": round(ms, 1)})
+
+    def smtp(self, host, rcpt, ms, code=None, msg=None, error=None):
+        event = {"k": "smtp", "host": host, "rcpt": rcpt_key(rcpt), "ms": round(ms, 1)}
+        if error is not None:
+            event["error"] = type(error).__name__
+            event["args"] = [_jsonable(a) for a in error.args]
+        else:
+            event["code"] = code
+            event["msg"] = _jsonable(msg)
+        self._write(event)
+
+    def close(self):
+        with self._lock:
+            self._f.close()
+
+
+class Replayer:
+    """Answers from a recorded transcript; repeated questions get the recorded answers in order, then the last one."""
+
+    def __init__(self, path, speed=1.0):
+        self.path = path
+        self.speed = float(speed)
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._events = defaultdict(list)
+        self._cursor = defaultdict(int)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    if line.endswith("\n"):
+                        self._add(json.loads(line))
+        except EOFError:
+            # recorder was killed mid-job: everything up to its last flush is usable
+            log.warning("replay: %s is truncated, using the complete part", path)
+
+    def _add(self, ev):
+        if ev["k"] == "mx":
+            self._events[("mx", ev["domain"])].append(ev)
+        elif ev["k"] == "catchall":
+            self._events[("catchall", ev["domain"])].append(ev)
+        elif ev["k"] == "smtp":
+            self._events[("smtp", ev["host"], ev["rcpt"])].append(ev)
+
+    def _next(self, key):
+        with self._lock:
+            events = self._events.get(key)
+            if not events:
+                self.misses += 1
+                return None
+            i = self._cursor[key]
+            self._cursor[key] = i + 1
+            ev = events[min(i, len(events) - 1)]
+        self.wait(ev.get("ms", 0) / 1000.0)
+        return ev
+
+    def wait(self, seconds):
+        if self.speed > 0 and seconds > 0:
+            time.sleep(seconds / self.speed)
+
+    def mx(self, domain):
+        ev = self._next(("mx", domain))
+        if ev is None:
+            log.warning("replay: no recorded MX answer for %s", domain)
+            return []
+        return ev["hosts"]
+
+    def catchall(self, domain):
+        ev = self._next(("catchall", domain))
+        return bool(ev and ev["verdict"])
+
+    def smtp(self, host, rcpt):
+        """Returns the recorded (code, msg) or raises the recorded exception."""
+        ev = self._next(("smtp", host, rcpt_key(rcpt)))
+        if ev is None:
+            raise ConnectionRefusedError(f"replay: no recorded dialogue with {host} for {rcpt}")
+        if "error" in ev:
+            raise _exception_class(ev["error"])(*ev.get("args", []))
+        return ev["code"], ev["msg"]
+
+
+_lock = threading.Lock()
+_recorders = {}
+_replayers = {}
+
+
+def recorder_for(cfg):
+    path = cfg.get("transcript_record")
+    if not path:
+        return None
+    with _lock:
+        if path not in _recorders:
+            _recorders[path] = Recorder(path)
+        return _recorders[path]
+
+
+def replayer_for(cfg):
+    path = cfg.get("transcript_replay")
+    if not path:
+        return None
+    speed = float(cfg.get("replay_speed", 1.0))
+    with _lock:
+        key = (path, speed)
+        if key not in _replayers:
+            _replayers[key] = Replayer(path, speed)
+        return _replayers[key]
+
+
+def reset_replay(cfg):
+    """Rewinds the replayer for ``cfg`` so the next job sees the transcript from the start."""
+    with _lock:
+        _replayers.pop((cfg.get("transcript_replay"), float(cfg.get("replay_speed", 1.0))), None)
+
+
+def flush_all():
+    with _lock:
+        for rec in _recorders.values():
+            with rec._lock:
+                rec._f.flush()
+
+
+def close_all():
+    with _lock:
+        for rec in _recorders.values():
+            rec.close()
+        _recorders.clear()
+
+
+atexit.register(close_all)